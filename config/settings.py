@@ -19,6 +19,7 @@ DEBUG = os.getenv("DEBUG").lower() == "true"
 ALLOWED_HOSTS = ["localhost", "127.0.0.1"]
 
 AUTH_USER_MODEL = "users.Employee"
+AUTHENTICATION_BACKENDS = ["users.backends.CachedModelBackend"]
 
 # === Apps ===
 INSTALLED_APPS = [
@@ -28,6 +29,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "corsheaders",
     "drf_yasg",
@@ -52,7 +54,7 @@ MIDDLEWARE = [
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "labbook.pagination.ApproximateCountPagination",
     "PAGE_SIZE": 10,
 }
 
@@ -160,6 +162,109 @@ if USE_CACHE:
             "LOCATION": os.getenv("REDIS_URL"),
         }
     }
+if "test" in sys.argv:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Сессии: при включённом кэше читаются из Redis, база остаётся постоянным хранилищем
+SESSION_ENGINE = os.getenv(
+    "SESSION_ENGINE",
+    (
+        "django.contrib.sessions.backends.cached_db"
+        if USE_CACHE
+        else "django.contrib.sessions.backends.db"
+    ),
+)
+
+# Время жизни сотрудника в общем кэше аутентификации, секунды
+EMPLOYEE_CACHE_TIMEOUT = 60 * 60
+
+# Кэш первого уровня в памяти процесса (сотрудник, записи, счётчики главной).
+# Инвалидации рассылаются через Redis pub/sub, в тестах — внутри процесса.
+L1_CACHE = {
+    "MAX_SIZE": 1000,
+    "TIMEOUT": 60,
+    "INVALIDATION": "redis" if USE_CACHE and os.getenv("REDIS_URL") else "local",
+    "REDIS_URL": os.getenv("REDIS_URL"),
+    "CHANNEL": "labbook:l1-invalidate",
+}
+if "test" in sys.argv:
+    L1_CACHE["INVALIDATION"] = "local"
+
+# Подсчёт количества записей в пагинации: "capped", "estimate" или "exact"
+NOTES_COUNT_STRATEGY = "capped"
+NOTES_COUNT_CAP = 10000
+
+# Время жизни версионируемого кэша записей сотрудника, секунды
+NOTES_CACHE_TIMEOUT = 300
+
+# Защита от одновременного пересчёта кэша: время жизни блокировки,
+# ожидание результата другого процесса (секунды) и коэффициент раннего обновления
+CACHE_LOCK_TIMEOUT = 30
+CACHE_LOCK_WAIT = 5
+CACHE_EARLY_REFRESH_BETA = 1.0
+
+# Время жизни общей статистики главной страницы, секунды
+HOME_STATS_CACHE_TIMEOUT = 30
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_CACHE_TIMEOUT = 30
+
+# Массовые операции с записями: максимум записей в запросе и размер пакета INSERT
+NOTES_BULK_MAX_SIZE = 5000
+NOTES_BULK_CHUNK_SIZE = 500
+
+# Размер порции строк при потоковой выгрузке записей
+NOTES_EXPORT_CHUNK_SIZE = 2000
+
+# Время жизни отрисованных строк таблицы записей, секунды
+NOTE_ROW_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Фоновая обработка (PDF-отчёты, миниатюры): пул процессов ("process")
+# или выполнение сразу в запросе ("sync")
+TASKS = {
+    "EXECUTOR": os.getenv("TASKS_EXECUTOR", "process"),
+    "MAX_WORKERS": int(os.getenv("TASKS_MAX_WORKERS", 2)),
+}
+if "test" in sys.argv:
+    TASKS["EXECUTOR"] = "sync"
+
+# PDF-отчёты: каталог готовых отчётов в MEDIA_ROOT, время ожидания рендеринга
+# (секунды) и шрифт с кириллицей
+REPORTS = {
+    "DIR": "reports",
+    "PENDING_TIMEOUT": 5 * 60,
+    "FONT": os.getenv("REPORTS_FONT", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"),
+}
+
+# Хранилище изображений по содержимому: каталог в MEDIA_ROOT и время (секунды),
+# в течение которого файл без ссылок не удаляется сборщиком мусора
+MEDIA_BLOBS = {
+    "DIR": "blobs",
+    "GC_GRACE": 60 * 60,
+}
+
+# Изображения выдаются после проверки владельца: Django отвечает заголовком
+# X-Accel-Redirect, и файл из внутреннего location отдаёт nginx.
+# Без nginx (разработка, DEBUG) файл отдаёт сам Django.
+PROTECTED_MEDIA = {
+    "X_ACCEL_REDIRECT": os.getenv("MEDIA_X_ACCEL_REDIRECT", str(not DEBUG)).lower() == "true",
+    "INTERNAL_LOCATION": "/protected-media/",
+}
+
+# Уменьшенные копии изображений записей и фото сотрудников: каталог в MEDIA_ROOT,
+# ширины для srcset, именованные размеры (миниатюра в таблицах, превью в карточках),
+# форматы в порядке предпочтения (недоступные в Pillow пропускаются) и качество
+THUMBNAILS = {
+    "DIR": "thumbs",
+    "WIDTHS": (160, 320, 640, 1280),
+    "SIZES": {"thumb": 160, "preview": 640},
+    "FORMATS": ("avif", "webp", "jpeg"),
+    "QUALITY": {"avif": 50, "webp": 75, "jpeg": 80},
+}
 
 CSRF_TRUSTED_ORIGINS = ["http://localhost:8000", "http://127.0.0.1:8000"]
 
@@ -1,8 +1,15 @@
-from datetime import datetime
-from django.db.models import Q
-from rest_framework import viewsets, permissions
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 from drf_spectacular.utils import (
     extend_schema,
@@ -11,21 +18,121 @@ from drf_spectacular.utils import (
     OpenApiTypes,
     OpenApiExample,
 )
+from .bulk import bulk_create_notes, bulk_update_notes
+from .cache import get_local_cache
+from .conditional import conditional_response, list_etag, note_etag
+from .export import csv_response, get_export_queryset, ndjson_response
+from .filters import FACET_PARAMS, filter_notes, get_owner_facet_counts
 from .models import ExperimentNote
-from .serialyzer import ExperimentNoteSerializer
+from .negotiation import IgnoreClientContentNegotiation
+from .pagination import KEYSET_ORDERING, KeysetPagination, is_cursor_mode
+from .serialyzer import (
+    ExperimentNoteAutocompleteSerializer,
+    ExperimentNoteBulkSerializer,
+    ExperimentNoteBulkUpdateSerializer,
+    ExperimentNoteListSerializer,
+    ExperimentNoteSerializer,
+    parse_fieldset,
+)
+from .services import (
+    autocomplete_notes,
+    get_cached_note,
+    get_home_stats,
+    request_cache_key,
+)
 from .permissions import IsOwnerOrReadOnly
+from .renderers import NDJSONRenderer
+from .reports import (
+    PENDING,
+    READY,
+    get_project_notes,
+    get_report_status,
+    note_report_name,
+    project_report_name,
+    request_report,
+)
+from .search import fuzzy_search_notes, search_notes
+
+
+CURSOR_PARAMETERS = [
+    OpenApiParameter(
+        name="pagination",
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+        required=False,
+        enum=["cursor"],
+        description="`cursor` — keyset-пагинация вместо постраничной.",
+    ),
+    OpenApiParameter(
+        name="cursor",
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+        required=False,
+        description="Непрозрачный курсор из полей `next`/`previous` предыдущего ответа.",
+    ),
+]
+
+SPARSE_PARAMETERS = [
+    OpenApiParameter(
+        name="fields",
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+        required=False,
+        description=(
+            "Поля ответа через запятую, например `id,code_of_project,title`. "
+            "Для списка и поиска выбираются из полного набора полей записи."
+        ),
+    ),
+    OpenApiParameter(
+        name="omit",
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+        required=False,
+        description="Поля, которые нужно исключить из ответа, через запятую.",
+    ),
+]
+
+# Действия, для которых поддерживается выбор полей ответа
+SPARSE_ACTIONS = ("list", "search", "retrieve")
 
 
 @extend_schema_view(
     list=extend_schema(
         tags=["Experiment Notes"],
         summary="Список записей текущего пользователя",
-        description="Возвращает постраничный список записей, принадлежащих текущему пользователю.",
+        description=(
+            "Возвращает постраничный список записей, принадлежащих текущему пользователю. "
+            "Поддерживает фильтры по статусу, версии протокола, потерям латекса, диапазону "
+            "дат изменения и числовым диапазонам. В поле `facets` возвращается количество "
+            "записей для каждого значения фильтров (считается одним запросом). "
+            "С `?pagination=cursor` выдача идёт по курсорам `next`/`previous` "
+            "в порядке (-updated_at, -id) без COUNT(*) и OFFSET. "
+            "По умолчанию возвращается облегчённый набор полей; `?fields=` и `?omit=` "
+            "задают поля ответа, и невыбранные столбцы не читаются из базы. "
+            "Ответ содержит `ETag`; при совпадении `If-None-Match` возвращается "
+            "304 Not Modified без тела. "
+            "С `Accept: application/x-ndjson` (или `?format=ndjson`) все подходящие "
+            "записи отдаются потоком, по одному JSON-объекту на строку, без пагинации."
+        ),
+        parameters=[
+            *[
+                OpenApiParameter(name=name, type=OpenApiTypes.STR, location=OpenApiParameter.QUERY)
+                for params in FACET_PARAMS.values()
+                for name in params
+            ],
+            *CURSOR_PARAMETERS,
+            *SPARSE_PARAMETERS,
+        ],
     ),
     retrieve=extend_schema(
         tags=["Experiment Notes"],
         summary="Получить запись по ID",
-        description="Возвращает запись по ID, если она принадлежит текущему пользователю.",
+        description=(
+            "Возвращает запись по ID, если она принадлежит текущему пользователю. "
+            "Поддерживает условные запросы: `ETag`/`If-None-Match` и "
+            "`Last-Modified`/`If-Modified-Since` (304 Not Modified)."
+        ),
+        parameters=SPARSE_PARAMETERS,
     ),
     create=extend_schema(
         tags=["Experiment Notes"],
@@ -72,26 +179,402 @@ class ExperimentNoteViewSet(viewsets.ModelViewSet):
 
     serializer_class = ExperimentNoteSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
 
     def get_queryset(self):
-        return ExperimentNote.objects.filter(owner=self.request.user).order_by(
-            "-updated_at"
+        queryset = ExperimentNote.objects.filter(owner=self.request.user).order_by(
+            *KEYSET_ORDERING
+        )
+        if self.action in SPARSE_ACTIONS:
+            queryset = queryset.only(*self.get_columns())
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action in ("list", "search") and "fields" not in self.request.query_params:
+            return ExperimentNoteListSerializer
+        return ExperimentNoteSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in SPARSE_ACTIONS:
+            kwargs.setdefault("fields", parse_fieldset(self.request.query_params.get("fields")))
+            kwargs.setdefault("omit", parse_fieldset(self.request.query_params.get("omit")))
+        return super().get_serializer(*args, **kwargs)
+
+    def get_columns(self):
+        """Столбцы, которые нужно прочитать из базы для выбранных полей ответа.
+
+        Ключевые столбцы (`id`, `owner`, `updated_at`) нужны для прав доступа
+        и keyset-пагинации и читаются всегда.
+        """
+        model_fields = {field.name for field in ExperimentNote._meta.concrete_fields}
+        sources = {field.source for field in self.get_serializer().fields.values()}
+        columns = {"id", "owner", "updated_at"} | (sources & model_fields)
+        if "picture" in columns:
+            # По ширине изображения выбирается его миниатюра
+            columns.add("picture_width")
+        return columns
+
+    @property
+    def paginator(self):
+        """Keyset-пагинация по запросу клиента, иначе постраничная из настроек."""
+        if not hasattr(self, "_paginator") and is_cursor_mode(self.request.query_params):
+            self._paginator = KeysetPagination()
+        return super().paginator
+
+    def get_paginator_kwargs(self):
+        """Параметры paginator'а: счётчик владельца вместо COUNT(*) для
+        нефильтрованного списка и кэш страниц выдачи."""
+        kwargs = {"cache_owner": self.request.user, "cache_key": request_cache_key(self.request)}
+        if self.action == "list" and not getattr(self, "filter_conditions", None):
+            kwargs["owner"] = self.request.user
+        return kwargs
+
+    def get_object(self):
+        """Запись для просмотра читается через кэш владельца."""
+        if self.action != "retrieve":
+            return super().get_object()
+        try:
+            pk = int(self.kwargs["pk"])
+        except (TypeError, ValueError):
+            raise Http404
+        note = get_cached_note(self.request.user.pk, pk)
+        if note is None:
+            raise Http404
+        self.check_object_permissions(self.request, note)
+        return note
+
+    def filter_queryset(self, queryset):
+        if self.action not in ("list", "search"):
+            return queryset
+        queryset, self.filter_conditions = filter_notes(
+            queryset, self.request.query_params
+        )
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return self.stream(self.filter_queryset(self.get_queryset()))
+
+        def render():
+            response = super(ExperimentNoteViewSet, self).list(request, *args, **kwargs)
+            if isinstance(response.data, dict):
+                counts = get_owner_facet_counts(
+                    request.user, self.filter_conditions, request_cache_key(request)
+                )
+                response.data["facets"] = {
+                    facet: {label: count for label, _, count in values}
+                    for facet, values in counts.items()
+                }
+            return response
+
+        return conditional_response(request, list_etag(request), render)
+
+    def stream(self, queryset):
+        """Все записи выборки потоком NDJSON, без пагинации и фасетов."""
+        response = ndjson_response(queryset, self.get_serializer())
+        patch_vary_headers(response, ("Accept",))
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        note = self.get_object()
+        return conditional_response(
+            request,
+            note_etag(request, note),
+            lambda: Response(self.get_serializer(note).data),
+            note.updated_at,
         )
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
+    @extend_schema(
+        tags=["Experiment Notes"],
+        summary="Массовое создание записей",
+        description=(
+            "Принимает список записей (не больше `NOTES_BULK_MAX_SIZE`) и создаёт их "
+            "пакетно от имени текущего пользователя. Некорректные записи и записи "
+            "с занятым `code_of_project` не прерывают пакет: они возвращаются в `errors` "
+            "с индексом в исходном списке, созданные — в `created` с присвоенным `id`. "
+            "Код ответа 201, если создана хотя бы одна запись, иначе 400."
+        ),
+        request=ExperimentNoteBulkSerializer(many=True),
+        responses={201: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+        examples=[
+            OpenApiExample(
+                "Пример ответа",
+                value={
+                    "created": [{"index": 0, "id": 42}],
+                    "errors": [
+                        {
+                            "index": 1,
+                            "errors": {
+                                "code_of_project": [
+                                    "Запись с таким кодом проекта уже существует."
+                                ]
+                            },
+                        }
+                    ],
+                },
+                response_only=True,
+            )
+        ],
+    )
+    @action(detail=False, methods=["post"], url_path="bulk", pagination_class=None)
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({"non_field_errors": ["Ожидается список записей."]})
+        if len(items) > settings.NOTES_BULK_MAX_SIZE:
+            raise ValidationError(
+                {
+                    "non_field_errors": [
+                        f"Не больше {settings.NOTES_BULK_MAX_SIZE} записей за запрос."
+                    ]
+                }
+            )
+        created, errors = bulk_create_notes(request.user, items)
+        return Response(
+            {
+                "created": [{"index": index, "id": note.pk} for index, note in created],
+                "errors": [
+                    {"index": index, "errors": detail}
+                    for index, detail in sorted(errors.items())
+                ],
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @extend_schema(
+        tags=["Experiment Notes"],
+        summary="Массовое изменение записей",
+        description=(
+            "Изменяет записи текущего пользователя с перечисленными `ids` одним запросом "
+            "UPDATE: `changes` задаёт новые значения полей, `increment` — приращение "
+            "(например, `{\"version_of_protocol\": 1}`), `from_status` ограничивает "
+            "изменение записями в этом статусе (перевод статуса пакетом). Чужие и "
+            "несуществующие id пропускаются. Возвращает количество и id изменённых записей."
+        ),
+        request=ExperimentNoteBulkUpdateSerializer,
+        responses={200: OpenApiTypes.OBJECT},
+        examples=[
+            OpenApiExample(
+                "Перевод черновиков в работу",
+                value={
+                    "ids": [1, 2, 3],
+                    "changes": {"status": "in_progress"},
+                    "from_status": "draft",
+                },
+                request_only=True,
+            ),
+            OpenApiExample(
+                "Пример ответа",
+                value={"updated": 2, "ids": [1, 3]},
+                response_only=True,
+            ),
+        ],
+    )
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        serializer = ExperimentNoteBulkUpdateSerializer(
+            data=request.data, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        pks = bulk_update_notes(request.user, **serializer.validated_data)
+        return Response({"updated": len(pks), "ids": pks})
+
+    @extend_schema(
+        tags=["Experiment Notes"],
+        summary="Выгрузка записей в CSV",
+        description=(
+            "Потоково выгружает все записи текущего пользователя в CSV (UTF-8 с BOM). "
+            "Принимает те же фильтры, что и список, и `search_query` поиска. "
+            "Записи читаются из базы порциями, объём памяти не зависит от их количества."
+        ),
+        parameters=[
+            *[
+                OpenApiParameter(name=name, type=OpenApiTypes.STR, location=OpenApiParameter.QUERY)
+                for params in FACET_PARAMS.values()
+                for name in params
+            ],
+            OpenApiParameter(
+                name="search_query",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Поисковый запрос.",
+            ),
+        ],
+        responses={(200, "text/csv"): OpenApiTypes.STR},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="export",
+        pagination_class=None,
+        content_negotiation_class=IgnoreClientContentNegotiation,
+    )
+    def export(self, request):
+        return csv_response(get_export_queryset(request.user, request.query_params))
+
+    def report_response(self, name, title, notes, url):
+        """Состояние отчёта; если отчёта нет, запускается его рендеринг."""
+        report_status = request_report(name, title, notes)
+        data = {"status": report_status}
+        if report_status == READY:
+            data["url"] = self.request.build_absolute_uri(url)
+        code = status.HTTP_202_ACCEPTED if report_status == PENDING else status.HTTP_200_OK
+        return Response(data, status=code)
+
+    def report_file(self, name, filename):
+        """Готовый отчёт из хранилища."""
+        if name is None or get_report_status(name) != READY:
+            raise Http404("Отчёт не готов.")
+        return FileResponse(
+            default_storage.open(name),
+            as_attachment=True,
+            filename=filename,
+            content_type="application/pdf",
+        )
+
+    def get_project_code(self):
+        code = self.request.query_params.get("code", "").strip()
+        if not code:
+            raise ValidationError({"code": ["Укажите код проекта."]})
+        return code
+
+    @extend_schema(
+        tags=["Reports"],
+        summary="PDF-отчёт по записи",
+        description=(
+            "Возвращает состояние PDF-отчёта по записи. Если отчёта по текущей версии "
+            "записи ещё нет, запускает его рендеринг в фоновом пуле процессов и "
+            "отвечает 202 со статусом `pending` — запрос нужно повторить позже. "
+            "Готовый отчёт (`ready`) содержит ссылку `url` на файл; пока запись "
+            "не изменилась, отчёт повторно не рендерится."
+        ),
+        request=None,
+        responses={200: OpenApiTypes.OBJECT, 202: OpenApiTypes.OBJECT},
+        examples=[
+            OpenApiExample(
+                "Отчёт готов",
+                value={"status": "ready", "url": "http://localhost:8000/api/notes/1/report/pdf/"},
+            )
+        ],
+    )
+    @action(detail=True, methods=["get"], url_path="report", pagination_class=None)
+    def report(self, request, pk=None):
+        note = self.get_object()
+        return self.report_response(
+            note_report_name(note),
+            note.title,
+            [note],
+            reverse("labbook:notes-report-pdf", args=[note.pk]),
+        )
+
+    @extend_schema(
+        tags=["Reports"],
+        summary="Скачать PDF-отчёт по записи",
+        description="Отдаёт готовый отчёт; если отчёт ещё не готов — 404.",
+        responses={(200, "application/pdf"): OpenApiTypes.BINARY},
+    )
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path="report/pdf",
+        pagination_class=None,
+        content_negotiation_class=IgnoreClientContentNegotiation,
+    )
+    def report_pdf(self, request, pk=None):
+        note = self.get_object()
+        return self.report_file(note_report_name(note), f"{note.code_of_project}.pdf")
+
+    @extend_schema(
+        tags=["Reports"],
+        summary="PDF-отчёт по проекту",
+        description=(
+            "То же, что отчёт по записи, для всех записей текущего пользователя, "
+            "код проекта которых начинается с `code`. Отчёт рендерится заново, "
+            "только если изменилась хотя бы одна из этих записей."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name="code",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=True,
+                description="Код проекта (начало `code_of_project`).",
+            ),
+        ],
+        responses={200: OpenApiTypes.OBJECT, 202: OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, methods=["get"], url_path="project-report", pagination_class=None)
+    def project_report(self, request):
+        code = self.get_project_code()
+        name = project_report_name(request.user, code)
+        if name is None:
+            raise Http404("Записей с таким кодом проекта нет.")
+        return self.report_response(
+            name,
+            f"Отчёт по проекту {code}",
+            get_project_notes(request.user, code).iterator(),
+            "%s?%s" % (reverse("labbook:notes-project-report-pdf"), request.GET.urlencode()),
+        )
+
+    @extend_schema(
+        tags=["Reports"],
+        summary="Скачать PDF-отчёт по проекту",
+        description="Отдаёт готовый отчёт по проекту; если отчёт ещё не готов — 404.",
+        parameters=[
+            OpenApiParameter(
+                name="code",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=True,
+                description="Код проекта (начало `code_of_project`).",
+            ),
+        ],
+        responses={(200, "application/pdf"): OpenApiTypes.BINARY},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="project-report/pdf",
+        pagination_class=None,
+        content_negotiation_class=IgnoreClientContentNegotiation,
+    )
+    def project_report_pdf(self, request):
+        code = self.get_project_code()
+        return self.report_file(
+            project_report_name(request.user, code), f"{code}.pdf"
+        )
+
     @extend_schema(
         tags=["Experiment Notes"],
         summary="Поиск по записям",
-        description="Ищет подстроку в `title` и `code_of_project` среди записей текущего пользователя.",
+        description=(
+            "Полнотекстовый поиск по `title`, `code_of_project` и `comments` среди записей "
+            "текущего пользователя с сортировкой по релевантности (`ts_rank`). "
+            "Режим `mode=fuzzy` ищет похожие коды проектов и названия с опечатками "
+            "(pg_trgm) и сортирует по степени сходства. В режиме `pagination=cursor` "
+            "найденные записи выдаются в порядке (-updated_at, -id). "
+            "С `Accept: application/x-ndjson` найденные записи отдаются потоком, "
+            "по одной на строку, без пагинации."
+        ),
         parameters=[
             OpenApiParameter(
                 name="search_query",
                 type=OpenApiTypes.STR,
                 location=OpenApiParameter.QUERY,
                 required=False,
-                description="Подстрока поиска по `title` и `code_of_project`.",
+                description="Поисковый запрос (синтаксис websearch: слова, \"фразы\", -исключения).",
+            ),
+            OpenApiParameter(
+                name="mode",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                enum=["fulltext", "fuzzy"],
+                description="Режим поиска: `fulltext` (по умолчанию) или `fuzzy` — «возможно, вы имели в виду».",
             ),
             OpenApiParameter(
                 name="page",
@@ -100,8 +583,10 @@ class ExperimentNoteViewSet(viewsets.ModelViewSet):
                 required=False,
                 description="Номер страницы постраничной выдачи.",
             ),
+            *CURSOR_PARAMETERS,
+            *SPARSE_PARAMETERS,
         ],
-        responses={200: ExperimentNoteSerializer(many=True)},
+        responses={200: ExperimentNoteListSerializer(many=True)},
         examples=[
             OpenApiExample(
                 "Пример запроса",
@@ -114,9 +599,12 @@ class ExperimentNoteViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=["get"], url_path="search")
     def search(self, request):
         q = request.query_params.get("search_query", "")
-        qs = self.get_queryset()
-        if q:
-            qs = qs.filter(Q(title__icontains=q) | Q(code_of_project__icontains=q))
+        if request.query_params.get("mode") == "fuzzy":
+            qs = fuzzy_search_notes(self.filter_queryset(self.get_queryset()), q)
+        else:
+            qs = search_notes(self.filter_queryset(self.get_queryset()), q)
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return self.stream(qs)
         page = self.paginate_queryset(qs)
         if page is not None:
             ser = self.get_serializer(page, many=True)
@@ -124,14 +612,67 @@ class ExperimentNoteViewSet(viewsets.ModelViewSet):
         ser = self.get_serializer(qs, many=True)
         return Response(ser.data)
 
+    @extend_schema(
+        tags=["Experiment Notes"],
+        summary="Автодополнение поиска",
+        description=(
+            "Возвращает первые записи текущего пользователя, у которых `code_of_project` "
+            "или `title` начинаются с `q`. Ответ содержит только `id`, `code_of_project` "
+            "и `title` и кэшируется на короткое время — эндпоинт рассчитан на вызов "
+            "при каждом нажатии клавиши."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name="q",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=True,
+                description="Начало кода проекта или названия.",
+            ),
+        ],
+        responses={200: ExperimentNoteAutocompleteSerializer(many=True)},
+    )
+    @action(detail=False, methods=["get"], url_path="autocomplete", pagination_class=None)
+    def autocomplete(self, request):
+        q = request.query_params.get("q", "")
+        return Response(autocomplete_notes(request.user, q))
+
     @extend_schema(
         tags=["Home"],
         summary="Статистика для главной страницы",
-        description="Возвращает количество записей, обновлённых **сегодня** (по дате сервера).",
+        description=(
+            "Возвращает количество записей, обновлённых **сегодня** (по дате сервера): "
+            "всеми сотрудниками (`count_entries`) и текущим пользователем "
+            "(`count_own_entries`). Значения читаются из дневных счётчиков активности, "
+            "общее число кэшируется на `HOME_STATS_CACHE_TIMEOUT` секунд."
+        ),
         responses={200: OpenApiTypes.OBJECT},
-        examples=[OpenApiExample("Пример ответа", value={"count_entries": 2})],
+        examples=[
+            OpenApiExample(
+                "Пример ответа", value={"count_entries": 2, "count_own_entries": 1}
+            )
+        ],
     )
     @action(detail=False, methods=["get"], url_path="home-stats")
     def home_stats(self, request):
-        count = ExperimentNote.objects.filter(updated_at=datetime.date.today()).count()
-        return Response({"count_entries": count})
+        return Response(get_home_stats(request.user))
+
+    @extend_schema(
+        tags=["Home"],
+        summary="Статистика кэша процесса",
+        description=(
+            "Размер, попадания, промахи и вытеснения кэша первого уровня в памяти "
+            "обработавшего запрос процесса (для подбора `L1_CACHE`). "
+            "Доступно только администраторам."
+        ),
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="cache-stats",
+        permission_classes=[permissions.IsAdminUser],
+        pagination_class=None,
+    )
+    def cache_stats(self, request):
+        return Response({"pid": os.getpid(), **get_local_cache().stats()})
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LabbookConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "labbook"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import MediaBlob
+
+
+def is_blob(name):
+    """Файл лежит в хранилище по содержимому (а не загружен до его появления)."""
+    return bool(name) and name.startswith(settings.MEDIA_BLOBS["DIR"] + "/")
+
+
+def change_refcount(name, delta):
+    """Изменение счётчика ссылок на файл хранилища по содержимому.
+
+    Строка счётчика блокируется до конца транзакции: `gc_media_blobs` берёт ту же
+    блокировку и дожидается фиксации, прежде чем решать, удалять ли файл.
+    """
+    if not is_blob(name):
+        return
+    with transaction.atomic():
+        blob, _ = MediaBlob.objects.select_for_update().get_or_create(name=name)
+        MediaBlob.objects.filter(pk=blob.pk).update(
+            refcount=Greatest(F("refcount") + delta, 0), updated_at=timezone.now()
+        )
+
+
+def touch_blob(name):
+    """Отметка времени повторной загрузки файла в строке его счётчика."""
+    MediaBlob.objects.filter(name=name).update(updated_at=timezone.now())
+
+
+def update_file_refs(instance, field_name, created):
+    """Перенос ссылки со старого файла поля на новый после сохранения объекта.
+
+    Старое имя файла запоминается в `from_db` модели как `_loaded_<поле>`.
+    Если объект создан не из базы и старое имя неизвестно, счётчики не
+    меняются: расхождения исправляет `gc_media_blobs`, который перед удалением
+    файла проверяет ссылки в базе.
+    """
+    if field_name in instance.get_deferred_fields():
+        return
+    file = getattr(instance, field_name)
+    current = file.name if file else None
+    loaded = "_loaded_%s" % field_name
+    previous = None if created else getattr(instance, loaded, current)
+    previous = getattr(previous, "name", previous) or None
+    if previous != current:
+        change_refcount(current, 1)
+        change_refcount(previous, -1)
+    setattr(instance, loaded, current)
+
+
+def release_file_ref(instance, field_name):
+    """Снятие ссылки на файл удалённого объекта."""
+    if field_name in instance.get_deferred_fields():
+        return
+    file = getattr(instance, field_name)
+    if file:
+        change_refcount(file.name, -1)
@@ -0,0 +1,134 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import ExperimentNote
+from .serialyzer import ExperimentNoteBulkSerializer
+from .services import change_daily_activity, change_note_counter, invalidate_notes
+
+CODE_CONFLICT_ERROR = {
+    "code_of_project": ["Запись с таким кодом проекта уже существует."]
+}
+
+
+def validate_notes(items):
+    """Проверка пакета записей.
+
+    Каждая запись проверяется сериализатором отдельно, ошибки собираются
+    по индексам. Занятые коды проектов ищутся одним запросом на весь пакет,
+    повторы кода внутри пакета тоже считаются конфликтом.
+    Возвращает список (индекс, данные) корректных записей и словарь ошибок.
+    """
+    serializer = ExperimentNoteBulkSerializer()
+    valid, errors = [], {}
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, serializer.run_validation(item)))
+        except ValidationError as exc:
+            errors[index] = exc.detail
+
+    codes = {data["code_of_project"] for _, data in valid}
+    taken = set(
+        ExperimentNote.objects.filter(code_of_project__in=codes).values_list(
+            "code_of_project", flat=True
+        )
+    )
+    unique = []
+    for index, data in valid:
+        if data["code_of_project"] in taken:
+            errors[index] = CODE_CONFLICT_ERROR
+            continue
+        taken.add(data["code_of_project"])
+        unique.append((index, data))
+    return unique, errors
+
+
+def _insert_chunk(chunk, owner):
+    """Вставка части пакета одним INSERT.
+
+    Если код проекта успели занять параллельно, часть вставляется построчно,
+    и конфликтующие записи попадают в ошибки.
+    """
+    notes = [(index, ExperimentNote(owner=owner, **data)) for index, data in chunk]
+    try:
+        with transaction.atomic():
+            ExperimentNote.objects.bulk_create([note for _, note in notes])
+        return notes, {}
+    except IntegrityError:
+        pass
+    created, errors = [], {}
+    for index, note in notes:
+        try:
+            with transaction.atomic():
+                ExperimentNote.objects.bulk_create([note])
+            created.append((index, note))
+        except IntegrityError:
+            errors[index] = CODE_CONFLICT_ERROR
+    return created, errors
+
+
+@transaction.atomic
+def bulk_create_notes(owner, items):
+    """Массовое создание записей сотрудника.
+
+    Записи вставляются через `bulk_create` частями по `NOTES_BULK_CHUNK_SIZE`.
+    `bulk_create` не отправляет сигналы, поэтому счётчики записей, дневная
+    активность и кэш владельца обновляются здесь один раз на весь пакет.
+    Возвращает список (индекс, запись) созданных записей и словарь ошибок по индексам.
+    """
+    valid, errors = validate_notes(items)
+    created = []
+    size = settings.NOTES_BULK_CHUNK_SIZE
+    for start in range(0, len(valid), size):
+        end = start + size
+        chunk_created, chunk_errors = _insert_chunk(valid[start:end], owner)
+        created += chunk_created
+        errors.update(chunk_errors)
+
+    if created:
+        change_note_counter(owner.pk, len(created))
+        activity = Counter(note.get_activity_key() for _, note in created)
+        for activity_key, count in activity.items():
+            change_daily_activity(activity_key, count)
+        invalidate_notes(owner.pk, activity_keys=activity)
+    return created, errors
+
+
+@transaction.atomic
+def bulk_update_notes(owner, ids, changes, increment=None, from_status=None):
+    """Массовое изменение записей сотрудника одним UPDATE.
+
+    Владелец (и при `from_status` — текущий статус) проверяется в условии
+    запроса, поэтому чужие записи не изменяются и не загружаются. Строки
+    предварительно блокируются одним SELECT, чтобы перенести их из дневных
+    счётчиков активности за старые даты изменения в сегодняшний.
+    Возвращает id изменённых записей.
+    """
+    queryset = ExperimentNote.objects.filter(owner=owner, pk__in=ids)
+    if from_status is not None:
+        queryset = queryset.filter(status=from_status)
+    rows = list(queryset.select_for_update().values_list("pk", "updated_at"))
+    if not rows:
+        return []
+
+    now = timezone.now()
+    values = dict(changes)
+    for name, delta in (increment or {}).items():
+        values[name] = F(name) + delta
+    pks = [pk for pk, _ in rows]
+    queryset.filter(pk__in=pks).update(updated_at=now, **values)
+
+    new_activity = (owner.pk, timezone.localdate(now))
+    old_activity = Counter(
+        (owner.pk, timezone.localdate(updated_at)) for _, updated_at in rows
+    )
+    for activity_key, count in old_activity.items():
+        if activity_key != new_activity:
+            change_daily_activity(activity_key, -count)
+            change_daily_activity(new_activity, count)
+    invalidate_notes(owner.pk, pks, [*old_activity, new_activity])
+    return pks
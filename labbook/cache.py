@@ -0,0 +1,227 @@
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+
+
+def _lock_key(key):
+    return "%s:lock" % key
+
+
+def _should_refresh(delta, expires_at, beta):
+    """Вероятностное раннее обновление (XFetch).
+
+    Чем ближе срок истечения и чем дольше пересчёт (`delta`), тем вероятнее,
+    что очередной запрос пересчитает значение заранее, пока остальные ещё
+    получают закэшированное.
+    """
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+def _recompute(key, compute, timeout):
+    """Пересчёт значения под уже захваченной блокировкой."""
+    try:
+        started = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - started
+        cache.set(key, (value, delta, time.time() + timeout), timeout)
+        return value
+    finally:
+        cache.delete(_lock_key(key))
+
+
+def get_or_compute(key, compute, timeout, beta=None):
+    """Чтение значения из кэша с защитой от одновременного пересчёта.
+
+    Значение хранится вместе со временем пересчёта и сроком истечения. Незадолго
+    до истечения один из запросов пересчитывает его заранее. Пересчёт выполняет
+    только процесс, захвативший блокировку (`cache.add`): остальные отдают
+    текущее значение, а при полном промахе ждут результат до
+    `CACHE_LOCK_WAIT` секунд и лишь затем считают сами.
+    """
+    beta = settings.CACHE_EARLY_REFRESH_BETA if beta is None else beta
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expires_at = entry
+        if not _should_refresh(delta, expires_at, beta):
+            return value
+        if not cache.add(_lock_key(key), 1, settings.CACHE_LOCK_TIMEOUT):
+            return value
+        return _recompute(key, compute, timeout)
+
+    if cache.add(_lock_key(key), 1, settings.CACHE_LOCK_TIMEOUT):
+        return _recompute(key, compute, timeout)
+
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return compute()
+
+
+def instance_values(instance, attnames):
+    """Значения столбцов объекта модели для кэша; файлы сохраняются по имени."""
+    values = []
+    for name in attnames:
+        value = getattr(instance, name)
+        if isinstance(value, FieldFile):
+            value = value.name
+        values.append(value)
+    return tuple(values)
+
+
+class LocalCache:
+    """Кэш первого уровня в памяти процесса: ограниченный LRU со сроком жизни записей.
+
+    Значения не сериализуются, поэтому в нём хранятся только неизменяемые
+    данные (числа, кортежи строк), а объекты моделей собираются из них заново.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self._data.pop(key, None)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, timeout=None):
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Статистика попаданий для подбора размера кэша."""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / requests, 4) if requests else None,
+            }
+
+
+class LocalInvalidation:
+    """Рассылка инвалидаций внутри одного процесса (тесты, runserver)."""
+
+    def __init__(self):
+        self._callbacks = []
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    def publish(self, key):
+        for callback in self._callbacks:
+            callback(key)
+
+
+class RedisInvalidation:
+    """Рассылка инвалидаций всем процессам через Redis pub/sub.
+
+    Подписка слушается в фоновом потоке процесса. Если соединение потеряно,
+    устаревание записей первого уровня ограничено их сроком жизни.
+    """
+
+    def __init__(self, url, channel):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+
+    def subscribe(self, callback):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: lambda message: callback(message["data"].decode())})
+        pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def publish(self, key):
+        self.client.publish(self.channel, key)
+
+
+_local_cache = None
+_invalidation = None
+_setup_lock = threading.Lock()
+
+
+def get_local_cache():
+    """Кэш первого уровня текущего процесса.
+
+    Создаётся при первом обращении, то есть уже в рабочем процессе gunicorn,
+    и тогда же подписывается на инвалидации.
+    """
+    global _local_cache, _invalidation
+    if _local_cache is None:
+        with _setup_lock:
+            if _local_cache is None:
+                options = settings.L1_CACHE
+                if options["INVALIDATION"] == "redis":
+                    _invalidation = RedisInvalidation(options["REDIS_URL"], options["CHANNEL"])
+                else:
+                    _invalidation = LocalInvalidation()
+                local_cache = LocalCache(options["MAX_SIZE"], options["TIMEOUT"])
+                _invalidation.subscribe(
+                    lambda message: [local_cache.delete(key) for key in message.split()]
+                )
+                _local_cache = local_cache
+    return _local_cache
+
+
+def invalidate_local(*keys):
+    """Удаление ключей из кэша первого уровня во всех процессах.
+
+    Ключи рассылаются одним сообщением через пробел. Рассылка повторяется после
+    фиксации транзакции: иначе другой процесс мог бы успеть закэшировать данные,
+    прочитанные до коммита.
+    """
+    if not keys:
+        return
+    local_cache = get_local_cache()
+    for key in keys:
+        local_cache.delete(key)
+    message = " ".join(keys)
+    _invalidation.publish(message)
+    transaction.on_commit(lambda: _invalidation.publish(message))
+
+
+def get_local_or_compute(key, compute, timeout=None):
+    """Чтение значения из кэша первого уровня; при промахе вызывается `compute()`."""
+    local_cache = get_local_cache()
+    value = local_cache.get(key)
+    if value is None:
+        value = compute()
+        if value is not None:
+            local_cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,74 @@
+import hashlib
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+
+from .services import get_owner_version
+
+
+def make_etag(*parts):
+    """Сильный ETag из значений, от которых зависит представление ответа."""
+    raw = "|".join(str(part) for part in parts)
+    return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+
+def _representation(request, html):
+    """Общие части ETag: адрес с параметрами, формат ответа и, для HTML-страниц,
+    данные сотрудника из шапки и CSRF-cookie формы выхода."""
+    parts = [request.build_absolute_uri(), request.META.get("HTTP_ACCEPT", "")]
+    if html:
+        user = request.user
+        parts += [
+            user.pk,
+            user.is_superuser,
+            user.last_name,
+            user.first_name,
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+        ]
+    return parts
+
+
+def list_etag(request, html=False):
+    """ETag списка записей сотрудника: меняется вместе с версией его кэша.
+
+    В ETag входит текущая дата — от неё зависят фасеты "сегодня/неделя/месяц".
+    """
+    return make_etag(
+        "list",
+        get_owner_version(request.user.pk),
+        timezone.localdate().isoformat(),
+        *_representation(request, html),
+    )
+
+
+def note_etag(request, note, html=False):
+    """ETag записи: меняется при каждом сохранении вместе с `updated_at`."""
+    return make_etag(
+        "note", note.pk, note.updated_at.isoformat(), *_representation(request, html)
+    )
+
+
+def conditional_response(request, etag, render, last_modified=None):
+    """Ответ на условный GET.
+
+    Если `If-None-Match`/`If-Modified-Since` совпадают с текущей версией,
+    возвращается 304 Not Modified, и `render()` (запросы к базе, сериализация,
+    шаблон) не вызывается.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = render()
+    if response.status_code in (200, 304):
+        response.headers["ETag"] = etag
+        if timestamp is not None:
+            response.headers["Last-Modified"] = http_date(timestamp)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ("Accept",))
+    return response
@@ -0,0 +1,100 @@
+import csv
+import datetime
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .filters import filter_notes
+from .models import ExperimentNote
+from .pagination import KEYSET_ORDERING
+from .renderers import NDJSONRenderer, dumps_line
+from .search import search_notes
+
+# Столбцы выгрузки журнала в порядке таблицы experiment_notes.html
+EXPORT_FIELDS = (
+    "code_of_project",
+    "title",
+    "comments",
+    "status",
+    "version_of_protocol",
+    "latex_started_at",
+    "latex_completed_at",
+    "is_latex_loss",
+    "optical_density",
+    "signal_level",
+    "storage_buffer_ph",
+    "reminder_date",
+    "created_at",
+    "updated_at",
+)
+
+
+class Echo:
+    """Псевдофайл для csv.writer: `write` возвращает строку, а не пишет её."""
+
+    def write(self, value):
+        return value
+
+
+def get_export_queryset(owner, params):
+    """Записи сотрудника для выгрузки с теми же фильтрами и поиском, что и в списке."""
+    queryset, _ = filter_notes(ExperimentNote.objects.filter(owner=owner), params)
+    return search_notes(
+        queryset.order_by(*KEYSET_ORDERING), params.get("search_query", "")
+    )
+
+
+def _export_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value).isoformat(timespec="seconds")
+    return value
+
+
+def iter_csv(queryset):
+    """Строки CSV по одной записи.
+
+    Записи читаются через `values_list().iterator()` частями по
+    `NOTES_EXPORT_CHUNK_SIZE` (на PostgreSQL — серверным курсором), поэтому
+    память не зависит от количества записей.
+    """
+    writer = csv.writer(Echo())
+    # BOM, чтобы Excel открыл кириллицу в UTF-8
+    yield "\ufeff" + writer.writerow(
+        [ExperimentNote._meta.get_field(name).verbose_name for name in EXPORT_FIELDS]
+    )
+    rows = queryset.values_list(*EXPORT_FIELDS).iterator(
+        chunk_size=settings.NOTES_EXPORT_CHUNK_SIZE
+    )
+    for row in rows:
+        yield writer.writerow([_export_value(value) for value in row])
+
+
+def csv_response(queryset, filename="notes.csv"):
+    """Потоковый ответ с выгрузкой записей в CSV."""
+    return StreamingHttpResponse(
+        iter_csv(queryset),
+        content_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def iter_ndjson(queryset, serializer):
+    """Записи в формате NDJSON по одной строке.
+
+    Каждая запись сериализуется отдельно через `to_representation`, без
+    `ReturnList` на всю выдачу; записи читаются через `iterator()` частями по
+    `NOTES_EXPORT_CHUNK_SIZE` (на PostgreSQL — серверным курсором). Следующая
+    порция читается, только когда сервер запросил следующие строки ответа.
+    """
+    for note in queryset.iterator(chunk_size=settings.NOTES_EXPORT_CHUNK_SIZE):
+        yield dumps_line(serializer.to_representation(note))
+
+
+def ndjson_response(queryset, serializer):
+    """Потоковый ответ со всеми записями выборки в формате NDJSON."""
+    return StreamingHttpResponse(
+        iter_ndjson(queryset, serializer), content_type=NDJSONRenderer.media_type
+    )
@@ -0,0 +1,204 @@
+import datetime
+from decimal import Decimal
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .forms import NoteFilterForm
+from .models import NOTE_STATUSES, ExperimentNote
+from .services import cached_for_owner
+
+# Параметры фильтрации, сгруппированные по фасетам.
+FACET_PARAMS = {
+    "status": ("status",),
+    "version_of_protocol": ("version_of_protocol",),
+    "is_latex_loss": ("is_latex_loss",),
+    "updated_at": ("updated_from", "updated_to"),
+    "optical_density": ("optical_density_min", "optical_density_max"),
+    "signal_level": ("signal_level_min", "signal_level_max"),
+    "storage_buffer_ph": ("storage_buffer_ph_min", "storage_buffer_ph_max"),
+}
+
+
+def _range(field, low=None, high=None):
+    """Условие диапазона значений поля (границы включаются)."""
+    condition = Q()
+    if low is not None:
+        condition &= Q(**{f"{field}__gte": low})
+    if high is not None:
+        condition &= Q(**{f"{field}__lte": high})
+    return condition
+
+
+def _day_start(day):
+    """Начало дня в текущем часовом поясе."""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _date_range(field, first_day=None, last_day=None):
+    """Условие по дням для поля даты и времени (границы включаются).
+
+    Сравнение идёт с началом дня, а не через `__date`, чтобы использовался индекс.
+    """
+    condition = Q()
+    if first_day is not None:
+        condition &= Q(**{f"{field}__gte": _day_start(first_day)})
+    if last_day is not None:
+        condition &= Q(
+            **{f"{field}__lt": _day_start(last_day + datetime.timedelta(days=1))}
+        )
+    return condition
+
+
+def get_conditions(values):
+    """Построение условий фильтрации по фасетам из значений фильтров."""
+    conditions = {}
+    if "status" in values:
+        conditions["status"] = Q(status=values["status"])
+    if "version_of_protocol" in values:
+        conditions["version_of_protocol"] = Q(
+            version_of_protocol=values["version_of_protocol"]
+        )
+    if "is_latex_loss" in values:
+        conditions["is_latex_loss"] = Q(is_latex_loss=values["is_latex_loss"])
+    if "updated_from" in values or "updated_to" in values:
+        conditions["updated_at"] = _date_range(
+            "updated_at", values.get("updated_from"), values.get("updated_to")
+        )
+    for field in ("optical_density", "signal_level", "storage_buffer_ph"):
+        low, high = values.get(f"{field}_min"), values.get(f"{field}_max")
+        if low is not None or high is not None:
+            conditions[field] = _range(field, low, high)
+    return conditions
+
+
+def get_facet_buckets(versions):
+    """Значения фасетов: подпись и параметры фильтра, соответствующие значению.
+
+    `versions` — версии протокола, которые встречаются в записях.
+    """
+    today = timezone.localdate()
+    return {
+        "status": [(status, {"status": status}) for status in NOTE_STATUSES],
+        "version_of_protocol": [
+            (str(version), {"version_of_protocol": version}) for version in versions
+        ],
+        "is_latex_loss": [
+            ("true", {"is_latex_loss": True}),
+            ("false", {"is_latex_loss": False}),
+        ],
+        "updated_at": [
+            ("today", {"updated_from": today}),
+            ("week", {"updated_from": today - datetime.timedelta(days=7)}),
+            ("month", {"updated_from": today - datetime.timedelta(days=30)}),
+        ],
+        "optical_density": _decimal_buckets(
+            "optical_density", ("0.00", "0.99"), ("1.00", "4.99"), ("5.00", "10.00")
+        ),
+        "signal_level": _decimal_buckets(
+            "signal_level",
+            ("0.00", "0.24"),
+            ("0.25", "0.49"),
+            ("0.50", "0.74"),
+            ("0.75", "1.00"),
+        ),
+        "storage_buffer_ph": _decimal_buckets(
+            "storage_buffer_ph", ("0.00", "6.99"), ("7.00", "7.00"), ("7.01", "14.00")
+        ),
+    }
+
+
+def _decimal_buckets(field, *ranges):
+    return [
+        (
+            f"{low}–{high}",
+            {f"{field}_min": Decimal(low), f"{field}_max": Decimal(high)},
+        )
+        for low, high in ranges
+    ]
+
+
+def filter_notes(queryset, params):
+    """Применение фильтров из параметров запроса к записям.
+
+    Возвращает отфильтрованный queryset и условия по фасетам, которые
+    нужны для подсчёта `get_facet_counts`.
+    """
+    conditions = get_conditions(NoteFilterForm(params).get_values())
+    return queryset.filter(*conditions.values()), conditions
+
+
+def get_facet_counts(queryset, conditions):
+    """Подсчёт записей для каждого значения каждого фасета одним запросом.
+
+    Для значений фасета учитываются фильтры всех остальных фасетов, поэтому
+    выбранное значение не обнуляет счётчики соседних вариантов. Значения фасета
+    версий протокола берутся из самих записей (индекс `note_owner_version`).
+    """
+    versions = (
+        queryset.order_by("version_of_protocol")
+        .values_list("version_of_protocol", flat=True)
+        .distinct()
+    )
+    buckets = get_facet_buckets(versions)
+    aggregates = {}
+    labels = {}
+    for facet, values in buckets.items():
+        others = Q(*[q for name, q in conditions.items() if name != facet])
+        for label, bucket_params in values:
+            alias = f"facet_{len(aggregates)}"
+            bucket = get_conditions(bucket_params)[facet]
+            aggregates[alias] = Count("pk", filter=bucket & others)
+            labels[alias] = (facet, label, bucket_params)
+
+    counts = {facet: [] for facet in buckets}
+    for alias, count in queryset.aggregate(**aggregates).items():
+        facet, label, bucket_params = labels[alias]
+        counts[facet].append((label, bucket_params, count))
+    return counts
+
+
+def get_owner_facet_counts(owner, conditions, cache_key):
+    """Фасеты по записям сотрудника через его версионируемый кэш."""
+    return cached_for_owner(
+        owner.pk,
+        "%s:facets:%s" % (cache_key, timezone.localdate().isoformat()),
+        lambda: get_facet_counts(ExperimentNote.objects.filter(owner=owner), conditions),
+    )
+
+
+def _param_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def get_facet_links(counts, params):
+    """Подготовка фасетов для шаблона: ссылки на значения и сброс фильтра."""
+    facets = []
+    for facet, values in counts.items():
+        base = params.copy()
+        for name in FACET_PARAMS[facet] + ("page",):
+            base.pop(name, None)
+        links = []
+        for label, bucket_params, count in values:
+            query = base.copy()
+            for name, value in bucket_params.items():
+                query[name] = _param_value(value)
+            links.append(
+                {
+                    "label": label,
+                    "count": count,
+                    "query": query.urlencode(),
+                    "active": all(params.get(name) == query[name] for name in bucket_params),
+                }
+            )
+        facets.append(
+            {
+                "name": facet,
+                "title": ExperimentNote._meta.get_field(facet).verbose_name,
+                "values": links,
+                "reset": base.urlencode(),
+            }
+        )
+    return facets
@@ -30,3 +30,28 @@ class DateForm(forms.Form):
     """Класс формы для дат."""
 
     date = forms.DateTimeField(input_formats=["%d/%m/%Y %H:%M"])
+
+
+class NoteFilterForm(forms.Form):
+    """Класс формы фильтров списка записей (параметры GET-запроса)."""
+
+    status = forms.CharField(required=False, max_length=16)
+    version_of_protocol = forms.IntegerField(required=False, min_value=1)
+    is_latex_loss = forms.NullBooleanField(required=False)
+    updated_from = forms.DateField(required=False)
+    updated_to = forms.DateField(required=False)
+    optical_density_min = forms.DecimalField(required=False, decimal_places=2)
+    optical_density_max = forms.DecimalField(required=False, decimal_places=2)
+    signal_level_min = forms.DecimalField(required=False, decimal_places=2)
+    signal_level_max = forms.DecimalField(required=False, decimal_places=2)
+    storage_buffer_ph_min = forms.DecimalField(required=False, decimal_places=2)
+    storage_buffer_ph_max = forms.DecimalField(required=False, decimal_places=2)
+
+    def get_values(self):
+        """Метод возвращает только корректно заполненные фильтры."""
+        self.is_valid()
+        return {
+            name: value
+            for name, value in self.cleaned_data.items()
+            if value not in (None, "")
+        }
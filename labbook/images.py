@@ -0,0 +1,79 @@
+"""Уменьшенные копии изображений средствами Pillow.
+
+Как и `labbook.pdf`, модуль не импортирует Django: функции выполняются
+в процессах пула и получают только пути к файлам и параметры кодирования.
+"""
+
+import os
+
+from PIL import Image, ImageOps, features
+from PIL.ExifTags import Base
+
+# Имя формата Pillow и модуль/кодек, без которого формат недоступен
+FORMATS = {
+    "avif": ("AVIF", "avif"),
+    "webp": ("WEBP", "webp"),
+    "jpeg": ("JPEG", "jpg"),
+}
+
+SAVE_OPTIONS = {
+    "avif": {},
+    "webp": {"method": 4},
+    "jpeg": {"optimize": True, "progressive": True},
+}
+
+
+def supported_formats(formats):
+    """Форматы из `formats`, которые поддерживает установленный Pillow."""
+    return [name for name in formats if features.check(FORMATS[name][1])]
+
+
+def oriented_width(file):
+    """Ширина изображения с учётом поворота из EXIF, как у копий после
+    `exif_transpose`; пиксели не декодируются."""
+    with Image.open(file) as image:
+        if image.getexif().get(Base.Orientation) in (5, 6, 7, 8):
+            return image.height
+        return image.width
+
+
+def _to_rgb(image):
+    """Перевод в RGB; прозрачные области заливаются белым."""
+    if image.mode == "RGB":
+        return image
+    rgba = image.convert("RGBA")
+    background = Image.new("RGB", rgba.size, "white")
+    background.paste(rgba, mask=rgba)
+    return background
+
+
+def make_thumbnails(source, targets):
+    """Запись уменьшенных копий изображения `source`.
+
+    `targets` — список (путь, ширина, формат, качество). Изображение
+    уменьшается по ширине от большей к меньшей, каждая копия строится из
+    предыдущей; изображения уже оригинала не увеличиваются. Файл сначала
+    пишется во временный и затем переименовывается, чтобы не отдавать
+    недописанную копию.
+    """
+    widths = sorted({width for _, width, _, _ in targets}, reverse=True)
+    with Image.open(source) as image:
+        # JPEG сразу декодируется в уменьшенном масштабе
+        image.draft("RGB", (widths[0], image.height * widths[0] // image.width))
+        image = _to_rgb(ImageOps.exif_transpose(image))
+
+    resized = {}
+    for width in widths:
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+        resized[width] = image
+
+    for path, width, name, quality in targets:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.tmp"
+        resized[width].save(
+            temporary, FORMATS[name][0], quality=quality, **SAVE_OPTIONS[name]
+        )
+        os.replace(temporary, path)
+    return len(targets)
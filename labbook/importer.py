@@ -0,0 +1,153 @@
+import csv
+import datetime
+import io
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .export import EXPORT_FIELDS
+from .models import ExperimentNote
+from .services import change_daily_activity, change_note_counter, invalidate_notes
+
+# Столбцы, которые читаются из файла; даты создания и изменения проставляются при загрузке
+IMPORT_FIELDS = tuple(
+    name for name in EXPORT_FIELDS if name not in ("created_at", "updated_at")
+)
+
+
+def get_column_names(header):
+    """Сопоставление заголовков файла полям записи.
+
+    Подходят и имена полей, и подписи из выгрузки `labbook.export`.
+    """
+    names = {}
+    for name in IMPORT_FIELDS:
+        names[name] = name
+        names[str(ExperimentNote._meta.get_field(name).verbose_name)] = name
+    return [names.get(column.strip().lstrip("\ufeff")) for column in header]
+
+
+def _clean_column(field, raw_values, errors):
+    """Проверка одного столбца пакета ограничениями поля модели
+    (тип, диапазоны валидаторов, длина, десятичные знаки)."""
+    values = []
+    for index, raw in enumerate(raw_values):
+        if raw in (None, "") and field.has_default():
+            values.append(field.get_default())
+            continue
+        if raw in (None, "") and field.null:
+            values.append(None)
+            continue
+        try:
+            value = field.clean(raw, None)
+        except ValidationError as exc:
+            errors.setdefault(index, {})[field.name] = exc.messages
+            values.append(None)
+            continue
+        if isinstance(value, datetime.datetime) and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        values.append(value)
+    return values
+
+
+def validate_batch(rows):
+    """Проверка пакета строк файла по столбцам.
+
+    Каждый столбец проверяется целиком ограничениями поля модели, затем для
+    всего пакета проверяются правило `ExperimentNote.clean` (завершение
+    активации не раньше начала) и уникальность кодов проектов — одним
+    запросом к базе. Возвращает корректные строки (словари значений) и ошибки
+    по индексам строк пакета.
+    """
+    errors = {}
+    columns = {
+        name: _clean_column(
+            ExperimentNote._meta.get_field(name),
+            [row.get(name) for row in rows],
+            errors,
+        )
+        for name in IMPORT_FIELDS
+    }
+    for index, (started, completed) in enumerate(
+        zip(columns["latex_started_at"], columns["latex_completed_at"])
+    ):
+        if started and completed and completed < started:
+            errors.setdefault(index, {})["latex_completed_at"] = [
+                "Завершение активации не может быть раньше начала."
+            ]
+
+    codes = columns["code_of_project"]
+    taken = set(
+        ExperimentNote.objects.filter(code_of_project__in=set(codes)).values_list(
+            "code_of_project", flat=True
+        )
+    )
+    valid = []
+    for index, code in enumerate(codes):
+        if index in errors:
+            continue
+        if code in taken:
+            errors[index] = {"code_of_project": ["Код проекта уже занят."]}
+            continue
+        taken.add(code)
+        valid.append({name: columns[name][index] for name in IMPORT_FIELDS})
+    return valid, errors
+
+
+def _copy_value(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def copy_notes(notes):
+    """Загрузка записей в PostgreSQL через `COPY ... FROM STDIN` (формат CSV)."""
+    fields = [
+        field
+        for field in ExperimentNote._meta.concrete_fields
+        if field.attname in notes[0]
+    ]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for note in notes:
+        writer.writerow([_copy_value(note[field.attname]) for field in fields])
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    sql = "COPY %s (%s) FROM STDIN WITH (FORMAT csv)" % (
+        quote(ExperimentNote._meta.db_table),
+        ", ".join(quote(field.column) for field in fields),
+    )
+    with connection.cursor() as cursor:
+        cursor.copy_expert(sql, buffer)
+
+
+def load_notes(owner, notes):
+    """Загрузка проверенных записей сотрудника одним пакетом.
+
+    На PostgreSQL используется COPY, на остальных СУБД — `bulk_create`.
+    Сигналы при этом не отправляются, поэтому счётчики и кэш владельца
+    обновляются здесь на весь пакет.
+    """
+    if not notes:
+        return
+    now = timezone.now()
+    rows = [
+        {**note, "owner_id": owner.pk, "created_at": now, "updated_at": now}
+        for note in notes
+    ]
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            copy_notes(rows)
+        else:
+            ExperimentNote.objects.bulk_create(
+                [ExperimentNote(**row) for row in rows], batch_size=500
+            )
+        activity_key = (owner.pk, timezone.localdate(now))
+        change_note_counter(owner.pk, len(rows))
+        change_daily_activity(activity_key, len(rows))
+        invalidate_notes(owner.pk, activity_keys=[activity_key])
@@ -0,0 +1,143 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from labbook.models import ExperimentNote, MediaBlob
+from labbook.storage import blob_storage
+from labbook.thumbnails import delete_thumbnails
+from users.models import Employee
+
+# Поля изображений, ссылающиеся на файлы хранилища по содержимому
+BLOB_FIELDS = ((ExperimentNote, "picture"), (Employee, "avatar"))
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет файлы хранилища изображений по содержимому, на которые "
+        "не ссылается ни одна запись и ни один сотрудник."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace",
+            type=int,
+            default=settings.MEDIA_BLOBS["GC_GRACE"],
+            help="Не удалять файлы, оставшиеся без ссылок меньше указанного числа секунд.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать, что будет удалено.",
+        )
+
+    def list_blobs(self):
+        """Файлы хранилища на диске: имя -> время изменения."""
+        directory = settings.MEDIA_BLOBS["DIR"]
+        blobs = {}
+        if not blob_storage.exists(directory):
+            return blobs
+        for subdirectory in blob_storage.listdir(directory)[0]:
+            prefix = f"{directory}/{subdirectory}"
+            for filename in blob_storage.listdir(prefix)[1]:
+                name = f"{prefix}/{filename}"
+                blobs[name] = os.path.getmtime(blob_storage.path(name))
+        return blobs
+
+    def count_references(self, names):
+        """Количество ссылок на файлы из полей изображений, одним запросом на поле."""
+        references = Counter()
+        for model, field in BLOB_FIELDS:
+            rows = (
+                model._base_manager.filter(**{f"{field}__in": names})
+                .values_list(field)
+                .annotate(count=Count("pk"))
+                .order_by()
+            )
+            references.update(dict(rows))
+        return references
+
+    def delete_blob(self, name, deadline):
+        """Удаление файла, если на него так и не появилось ссылок.
+
+        Строка счётчика блокируется (`select_for_update`), поэтому незафиксированное
+        изменение счётчика в `change_refcount` дожидается сборщика или наоборот.
+        Файл, загруженный повторно после начала сборки, не удаляется.
+        """
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is not None and (blob.refcount or blob.updated_at >= deadline):
+                return False
+            if self.count_references([name])[name]:
+                return False
+            if blob_storage.exists(name):
+                if os.path.getmtime(blob_storage.path(name)) >= deadline.timestamp():
+                    return False
+                blob_storage.delete(name)
+            if blob is not None:
+                blob.delete()
+        delete_thumbnails(name)
+        return True
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        deadline = timezone.now() - timedelta(seconds=options["grace"])
+        blobs = self.list_blobs()
+
+        expired = {
+            name for name, mtime in blobs.items() if mtime < deadline.timestamp()
+        }
+        # Недописанные загрузки, оставшиеся после сбоя процесса
+        uploads = [name for name in expired if name.endswith(".upload")]
+        # Файлы без строки счётчика (загружены, но объект не сохранён)
+        known = set(
+            MediaBlob.objects.filter(name__in=list(blobs)).values_list(
+                "name", flat=True
+            )
+        )
+        candidates = expired - known - set(uploads)
+        # Файлы, на которые больше нет ссылок; недавно загруженные повторно
+        # (свежее время изменения файла) не трогаются
+        candidates.update(
+            name
+            for name in MediaBlob.objects.filter(
+                refcount=0, updated_at__lt=deadline
+            ).values_list("name", flat=True)
+            if name not in blobs or name in expired
+        )
+
+        # Счётчик может разойтись с базой, поэтому перед удалением ссылки проверяются
+        references = self.count_references(list(candidates))
+        restored = deleted = freed = 0
+        for name in sorted(candidates):
+            if references[name]:
+                restored += 1
+                if not dry_run:
+                    MediaBlob.objects.update_or_create(
+                        name=name, defaults={"refcount": references[name]}
+                    )
+                continue
+            size = blob_storage.size(name) if name in blobs else 0
+            if not dry_run and not self.delete_blob(name, deadline):
+                continue
+            self.stdout.write(f"{name} ({size} байт)")
+            deleted += 1
+            freed += size
+
+        if not dry_run:
+            for name in uploads:
+                blob_storage.delete(name)
+
+        summary = (
+            f"Удалено файлов: {deleted} ({freed / 1024 / 1024:.1f} МБ), "
+            f"недописанных загрузок: {len(uploads)}, "
+            f"исправлено счётчиков: {restored}"
+        )
+        if dry_run:
+            summary += " (пробный запуск)"
+        self.stdout.write(self.style.SUCCESS(summary))
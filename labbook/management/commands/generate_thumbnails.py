@@ -0,0 +1,121 @@
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from labbook.images import make_thumbnails, oriented_width
+from labbook.models import ExperimentNote
+from labbook.services import invalidate_notes
+from labbook.tasks import SyncExecutor
+from labbook.thumbnails import thumbnail_targets
+from users.backends import invalidate_employee
+from users.models import Employee
+
+IMAGE_FIELDS = ((ExperimentNote, "picture"), (Employee, "avatar"))
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт уменьшенные копии (AVIF, WebP, JPEG) уже загруженных "
+        "изображений записей и фото сотрудников."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Пересоздать копии, даже если они уже есть.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.TASKS["MAX_WORKERS"],
+            help="Количество процессов; при 1 обработка идёт в текущем процессе.",
+        )
+
+    def get_images(self):
+        """Изображения: имя -> ширина. Ширина изображений, загруженных до её
+        учёта, читается из файла и записывается в модели."""
+        images = {}
+        for model, field in IMAGE_FIELDS:
+            rows = (
+                model.objects.exclude(**{field: ""})
+                .exclude(**{f"{field}__isnull": True})
+                .values_list(field, f"{field}_width")
+                .distinct()
+            )
+            for name, width in rows:
+                images[name] = images.get(name) or width
+        for name, width in images.items():
+            if width is None:
+                images[name] = self.record_width(name)
+        return images
+
+    def record_width(self, name):
+        try:
+            width = oriented_width(default_storage.path(name))
+        except OSError:
+            return None
+        # update() не вызывает сигналы, поэтому кэши записей и сотрудников,
+        # в которых ширина ещё не указана, сбрасываются здесь.
+        notes = defaultdict(list)
+        for owner_id, pk in ExperimentNote.objects.filter(
+            picture=name, picture_width__isnull=True
+        ).values_list("owner_id", "pk"):
+            notes[owner_id].append(pk)
+        employees = list(
+            Employee.objects.filter(avatar=name, avatar_width__isnull=True).values_list(
+                "pk", flat=True
+            )
+        )
+        for model, field in IMAGE_FIELDS:
+            model.objects.filter(
+                **{field: name, f"{field}_width__isnull": True}
+            ).update(**{f"{field}_width": width})
+        for owner_id, pks in notes.items():
+            invalidate_notes(owner_id, pks)
+        for pk in employees:
+            invalidate_employee(pk)
+        return width
+
+    def handle(self, *args, **options):
+        jobs = {}
+        skipped = 0
+        for name, width in sorted(self.get_images().items()):
+            targets = thumbnail_targets(name, width, force=options["force"])
+            if targets:
+                jobs[name] = (default_storage.path(name), targets)
+            else:
+                skipped += 1
+
+        if options["workers"] > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=options["workers"],
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            executor = SyncExecutor()
+        futures = {
+            executor.submit(make_thumbnails, source, targets): name
+            for name, (source, targets) in jobs.items()
+        }
+        created = failed = 0
+        for future in as_completed(futures):
+            try:
+                future.result()
+                created += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"{futures[future]}: {exc}")
+        if isinstance(executor, ProcessPoolExecutor):
+            executor.shutdown()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Миниатюры созданы: {created}, ошибок: {failed}, "
+                f"уже были: {skipped}"
+            )
+        )
@@ -0,0 +1,78 @@
+import csv
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from labbook.importer import get_column_names, load_notes, validate_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает записи об экспериментах из CSV: проверка пакетами, "
+        "COPY на PostgreSQL и bulk_create на остальных СУБД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к CSV-файлу или `-` для stdin.")
+        parser.add_argument(
+            "--owner", required=True, help="Email сотрудника — владельца записей."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Количество строк, проверяемых и загружаемых за один раз.",
+        )
+        parser.add_argument("--delimiter", default=",", help="Разделитель столбцов.")
+
+    def handle(self, *args, **options):
+        try:
+            owner = get_user_model().objects.get(email=options["owner"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Сотрудник {options['owner']} не найден.")
+
+        if options["path"] == "-":
+            return self.import_file(sys.stdin, owner, options)
+        with open(options["path"], encoding="utf-8-sig", newline="") as file:
+            return self.import_file(file, owner, options)
+
+    def import_file(self, file, owner, options):
+        reader = csv.reader(file, delimiter=options["delimiter"])
+        columns = get_column_names(next(reader, []))
+        missing = {"code_of_project", "title"} - set(columns)
+        if missing:
+            raise CommandError(f"В файле нет столбцов: {', '.join(sorted(missing))}.")
+
+        loaded = skipped = 0
+        line = 2
+        started = time.perf_counter()
+        while True:
+            batch = list(islice(reader, options["batch_size"]))
+            if not batch:
+                break
+            rows = [
+                {name: value for name, value in zip(columns, row) if name}
+                for row in batch
+            ]
+            notes, errors = validate_batch(rows)
+            load_notes(owner, notes)
+            for index, detail in sorted(errors.items()):
+                for field, messages in detail.items():
+                    self.stderr.write(
+                        f"Строка {line + index}: {field}: {' '.join(messages)}"
+                    )
+            loaded += len(notes)
+            skipped += len(errors)
+            line += len(batch)
+
+        elapsed = time.perf_counter() - started
+        rate = loaded / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Загружено строк: {loaded}, пропущено: {skipped} "
+                f"за {elapsed:.2f} с ({rate:.0f} строк/с)"
+            )
+        )
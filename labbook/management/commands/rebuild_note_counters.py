@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from labbook.services import rebuild_note_counters
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики записей сотрудников и дневной активности."
+
+    def handle(self, *args, **options):
+        rows = rebuild_note_counters()
+        self.stdout.write(
+            self.style.SUCCESS(f"Счётчики пересчитаны, дневных строк: {rows}")
+        )
@@ -0,0 +1,59 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+import labbook.operations
+
+SEARCH_VECTOR_SQL = """
+CREATE OR REPLACE FUNCTION labbook_experimentnote_search_vector_update()
+RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.code_of_project, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(NEW.comments, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(NEW.comments, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER labbook_experimentnote_search_vector_trigger
+BEFORE INSERT OR UPDATE OF code_of_project, title, comments
+ON labbook_experimentnote
+FOR EACH ROW EXECUTE FUNCTION labbook_experimentnote_search_vector_update();
+
+UPDATE labbook_experimentnote SET title = title;
+"""
+
+DROP_SEARCH_VECTOR_SQL = """
+DROP TRIGGER IF EXISTS labbook_experimentnote_search_vector_trigger
+ON labbook_experimentnote;
+DROP FUNCTION IF EXISTS labbook_experimentnote_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labbook", "0002_alter_experimentnote_optical_density_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="experimentnote",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        labbook.operations.AddIndexPostgres(
+            model_name="experimentnote",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="note_search_vector_gin"
+            ),
+        ),
+        labbook.operations.RunSQLPostgres(
+            SEARCH_VECTOR_SQL, reverse_sql=DROP_SEARCH_VECTOR_SQL
+        ),
+    ]
@@ -0,0 +1,30 @@
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+import labbook.operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labbook", "0003_experimentnote_search_vector"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        labbook.operations.AddIndexPostgres(
+            model_name="experimentnote",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["code_of_project"],
+                opclasses=["gin_trgm_ops"],
+                name="note_code_trgm_gin",
+            ),
+        ),
+        labbook.operations.AddIndexPostgres(
+            model_name="experimentnote",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"], opclasses=["gin_trgm_ops"], name="note_title_trgm_gin"
+            ),
+        ),
+    ]
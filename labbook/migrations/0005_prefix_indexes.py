@@ -0,0 +1,37 @@
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+import labbook.operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labbook", "0004_trigram_indexes"),
+    ]
+
+    operations = [
+        labbook.operations.AddIndexPostgres(
+            model_name="experimentnote",
+            index=models.Index(
+                models.F("owner"),
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("code_of_project"),
+                    name="text_pattern_ops",
+                ),
+                name="note_owner_code_prefix",
+            ),
+        ),
+        labbook.operations.AddIndexPostgres(
+            model_name="experimentnote",
+            index=models.Index(
+                models.F("owner"),
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("title"),
+                    name="text_pattern_ops",
+                ),
+                name="note_owner_title_prefix",
+            ),
+        ),
+    ]
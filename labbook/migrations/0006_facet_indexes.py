@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labbook", "0005_prefix_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="experimentnote",
+            index=models.Index(fields=["owner", "status"], name="note_owner_status"),
+        ),
+        migrations.AddIndex(
+            model_name="experimentnote",
+            index=models.Index(
+                fields=["owner", "version_of_protocol"], name="note_owner_version"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="experimentnote",
+            index=models.Index(
+                fields=["owner", "is_latex_loss"], name="note_owner_latex_loss"
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labbook", "0006_facet_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="experimentnote",
+            options={
+                "ordering": ["-updated_at", "-id"],
+                "verbose_name": "Запись об эксперименте",
+                "verbose_name_plural": "Записи об эксперименте",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="experimentnote",
+            index=models.Index(
+                models.F("owner"),
+                models.OrderBy(models.F("updated_at"), descending=True),
+                models.OrderBy(models.F("id"), descending=True),
+                name="note_owner_updated",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="experimentnote",
+            index=models.Index(fields=["updated_at"], name="note_updated_at"),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labbook", "0007_access_pattern_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NoteCounter",
+            fields=[
+                (
+                    "owner",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="note_counter",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Сотрудник",
+                    ),
+                ),
+                (
+                    "notes_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество записей"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Счётчик записей",
+                "verbose_name_plural": "Счётчики записей",
+            },
+        ),
+    ]
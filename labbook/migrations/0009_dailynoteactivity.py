@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labbook", "0008_notecounter"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyNoteActivity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="День")),
+                (
+                    "notes_count",
+                    models.IntegerField(default=0, verbose_name="Количество записей"),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_note_activity",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Сотрудник",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Дневной счётчик записей",
+                "verbose_name_plural": "Дневные счётчики записей",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("owner", "day"), name="daily_activity_owner_day_unique"
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("owner__isnull", True)),
+                        fields=("day",),
+                        name="daily_activity_total_day_unique",
+                    ),
+                ],
+            },
+        ),
+    ]
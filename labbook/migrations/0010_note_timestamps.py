@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:18
+
+from django.db import migrations, models
+
+import labbook.operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labbook", "0009_dailynoteactivity"),
+    ]
+
+    operations = [
+        labbook.operations.AlterFieldSkipPostgresIndexes(
+            model_name="experimentnote",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True, verbose_name="Дата создания отчёта"
+            ),
+        ),
+        labbook.operations.AlterFieldSkipPostgresIndexes(
+            model_name="experimentnote",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Дата последнего изменения"
+            ),
+        ),
+    ]
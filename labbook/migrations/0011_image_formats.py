@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:44
+
+import django.core.validators
+import labbook.operations
+import users.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labbook", "0010_note_timestamps"),
+    ]
+
+    operations = [
+        labbook.operations.AlterFieldSkipPostgresIndexes(
+            model_name="experimentnote",
+            name="picture",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                upload_to="labbook/images",
+                validators=[
+                    users.validators.image_validate,
+                    django.core.validators.FileExtensionValidator(
+                        ["jpg", "jpeg", "png", "webp", "avif"],
+                        "Расширение файла « %(extension)s » не допускается. Разрешенные расширения: %(allowed_extensions)s .",
+                        "Недопустимое расширение!",
+                    ),
+                ],
+                verbose_name="Изображение",
+            ),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:47
+
+import django.core.validators
+import labbook.operations
+import labbook.storage
+import users.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labbook", "0011_image_formats"),
+    ]
+
+    operations = [
+        labbook.operations.AlterFieldSkipPostgresIndexes(
+            model_name="experimentnote",
+            name="picture",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=labbook.storage.get_blob_storage,
+                upload_to="labbook/images",
+                validators=[
+                    users.validators.image_validate,
+                    django.core.validators.FileExtensionValidator(
+                        ["jpg", "jpeg", "png", "webp", "avif"],
+                        "Расширение файла « %(extension)s » не допускается. Разрешенные расширения: %(allowed_extensions)s .",
+                        "Недопустимое расширение!",
+                    ),
+                ],
+                verbose_name="Изображение",
+            ),
+        ),
+        migrations.CreateModel(
+            name="MediaBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="Имя файла"
+                    ),
+                ),
+                (
+                    "refcount",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество ссылок"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Дата изменения счётчика"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Файл изображения",
+                "verbose_name_plural": "Файлы изображений",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("refcount", 0)),
+                        fields=["updated_at"],
+                        name="media_blob_orphans",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:49
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+import labbook.operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labbook", "0012_media_blobs"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        labbook.operations.AddIndexPostgres(
+            model_name="experimentnote",
+            index=models.Index(
+                models.F("owner"),
+                django.contrib.postgres.indexes.OpClass(
+                    models.F("picture"), name="text_pattern_ops"
+                ),
+                name="note_owner_picture",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labbook", "0013_note_owner_picture_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="experimentnote",
+            name="picture_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Ширина изображения"
+            ),
+        ),
+    ]
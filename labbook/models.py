@@ -1,3 +1,7 @@
+import datetime
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.core.validators import (
     FileExtensionValidator,
@@ -5,10 +9,24 @@ from django.core.validators import (
     MaxValueValidator,
 )
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Upper
 from django.utils import timezone
 from users.models import Employee
 
-from users.validators import image_validate
+from users.validators import IMAGE_EXTENSIONS, image_validate
+
+from .storage import get_blob_storage
+
+# Статусы записи в порядке прохождения эксперимента
+NOTE_STATUSES = ("draft", "in_progress", "review", "completed")
+
+
+class ExperimentNoteManager(models.Manager):
+    """Менеджер записей: служебный поисковый вектор по умолчанию не читается из базы."""
+
+    def get_queryset(self):
+        return super().get_queryset().defer("search_vector")
 
 
 class ExperimentNote(models.Model):
@@ -68,19 +86,26 @@ class ExperimentNote(models.Model):
 
     picture = models.ImageField(
         upload_to="labbook/images",
+        storage=get_blob_storage,
         null=True,
         blank=True,
         verbose_name="Изображение",
         validators=[
             image_validate,
             FileExtensionValidator(
-                ["jpg", "png"],
+                IMAGE_EXTENSIONS,
                 "Расширение файла « %(extension)s » не допускается. "
                 "Разрешенные расширения: %(allowed_extensions)s .",
                 "Недопустимое расширение!",
             ),
         ],
     )
+    picture_width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Ширина изображения",
+    )
 
     # Напоминание о завершении термостатирования
     reminder_date = models.DateTimeField(
@@ -97,15 +122,40 @@ class ExperimentNote(models.Model):
         verbose_name="Ответственный за запись об эксперименте",
     )
 
-    # Даты отчёта
-    created_at = models.DateField(
+    # Даты отчёта (с точностью до микросекунд: нужны для ETag/Last-Modified)
+    created_at = models.DateTimeField(
         auto_now_add=True, verbose_name="Дата создания отчёта"
     )
 
-    updated_at = models.DateField(
+    updated_at = models.DateTimeField(
         auto_now=True, verbose_name="Дата последнего изменения"
     )
 
+    # Поисковый вектор по title, code_of_project и comments.
+    # Заполняется триггером PostgreSQL (см. миграцию 0003).
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ExperimentNoteManager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает владельца, день изменения и изображение записи на момент
+        загрузки из базы (нужно для переноса записи между дневными счётчиками
+        активности и для счётчика ссылок на файлы)."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_activity = instance.get_activity_key()
+        instance._loaded_picture = instance.__dict__.get("picture")
+        return instance
+
+    def get_activity_key(self):
+        """Ключ дневного счётчика активности: (владелец, день последнего изменения)."""
+        updated_at = self.__dict__.get("updated_at")
+        if updated_at is None:
+            return None
+        if isinstance(updated_at, datetime.datetime):
+            updated_at = timezone.localdate(updated_at)
+        return self.owner_id, updated_at
+
     def clean(self):
         """Метод валидации данных"""
         errors = {}
@@ -133,4 +183,136 @@ class ExperimentNote(models.Model):
     class Meta:
         verbose_name = "Запись об эксперименте"
         verbose_name_plural = "Записи об эксперименте"
-        ordering = ["owner", "updated_at", "title"]
+        ordering = ["-updated_at", "-id"]
+        indexes = [
+            # Основной доступ: записи владельца, свежие сначала (список, keyset-пагинация)
+            models.Index(
+                F("owner"),
+                F("updated_at").desc(),
+                F("id").desc(),
+                name="note_owner_updated",
+            ),
+            # Статистика главной страницы по дате изменения
+            models.Index(fields=["updated_at"], name="note_updated_at"),
+            GinIndex(fields=["search_vector"], name="note_search_vector_gin"),
+            GinIndex(
+                fields=["code_of_project"],
+                opclasses=["gin_trgm_ops"],
+                name="note_code_trgm_gin",
+            ),
+            GinIndex(
+                fields=["title"], opclasses=["gin_trgm_ops"], name="note_title_trgm_gin"
+            ),
+            # Префиксный поиск (istartswith) для автодополнения
+            models.Index(
+                F("owner"),
+                OpClass(Upper("code_of_project"), name="text_pattern_ops"),
+                name="note_owner_code_prefix",
+            ),
+            models.Index(
+                F("owner"),
+                OpClass(Upper("title"), name="text_pattern_ops"),
+                name="note_owner_title_prefix",
+            ),
+            # Проверка доступа к изображению: записи владельца с этим файлом
+            # (точное имя или префикс для уменьшенных копий)
+            models.Index(
+                F("owner"),
+                OpClass(F("picture"), name="text_pattern_ops"),
+                name="note_owner_picture",
+            ),
+            # Фасетная фильтрация списка записей
+            models.Index(fields=["owner", "status"], name="note_owner_status"),
+            models.Index(
+                fields=["owner", "version_of_protocol"], name="note_owner_version"
+            ),
+            models.Index(
+                fields=["owner", "is_latex_loss"], name="note_owner_latex_loss"
+            ),
+        ]
+
+
+class NoteCounter(models.Model):
+    """Класс модели "Счётчик записей сотрудника" (денормализованный COUNT(*))."""
+
+    owner = models.OneToOneField(
+        Employee,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="note_counter",
+        verbose_name="Сотрудник",
+    )
+    notes_count = models.PositiveIntegerField(
+        default=0, verbose_name="Количество записей"
+    )
+
+    def __str__(self):
+        return f"{self.owner}: {self.notes_count}"
+
+    class Meta:
+        verbose_name = "Счётчик записей"
+        verbose_name_plural = "Счётчики записей"
+
+
+class DailyNoteActivity(models.Model):
+    """Класс модели "Дневной счётчик изменённых записей".
+
+    Хранит количество записей, последнее изменение которых пришлось на день
+    `day`, для каждого сотрудника и общий итог (строка с `owner = NULL`).
+    """
+
+    owner = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="daily_note_activity",
+        verbose_name="Сотрудник",
+    )
+    day = models.DateField(verbose_name="День")
+    notes_count = models.IntegerField(default=0, verbose_name="Количество записей")
+
+    def __str__(self):
+        return f"{self.owner or 'Все'} {self.day}: {self.notes_count}"
+
+    class Meta:
+        verbose_name = "Дневной счётчик записей"
+        verbose_name_plural = "Дневные счётчики записей"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "day"], name="daily_activity_owner_day_unique"
+            ),
+            models.UniqueConstraint(
+                fields=["day"],
+                condition=models.Q(owner__isnull=True),
+                name="daily_activity_total_day_unique",
+            ),
+        ]
+
+
+class MediaBlob(models.Model):
+    """Класс модели "Файл хранилища по содержимому".
+
+    Хранит количество ссылок на файл из изображений записей и фото сотрудников;
+    файлы без ссылок удаляет команда `gc_media_blobs`.
+    """
+
+    name = models.CharField(max_length=255, unique=True, verbose_name="Имя файла")
+    refcount = models.PositiveIntegerField(default=0, verbose_name="Количество ссылок")
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name="Дата изменения счётчика"
+    )
+
+    def __str__(self):
+        return f"{self.name}: {self.refcount}"
+
+    class Meta:
+        verbose_name = "Файл изображения"
+        verbose_name_plural = "Файлы изображений"
+        indexes = [
+            models.Index(
+                fields=["updated_at"],
+                condition=models.Q(refcount=0),
+                name="media_blob_orphans",
+            ),
+        ]
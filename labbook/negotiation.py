@@ -0,0 +1,17 @@
+from rest_framework.negotiation import BaseContentNegotiation
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """Согласование без учёта `Accept` и `?format=` клиента.
+
+    Нужно действиям, которые сами отдают файл (`HttpResponse` с собственным
+    `Content-Type`): ответ не проходит через рендерер, поэтому `Accept: text/csv`
+    или `application/pdf` не должен приводить к 406. Ошибки таких действий
+    рендерятся первым рендерером представления (JSON).
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
@@ -0,0 +1,85 @@
+from django.contrib.postgres.indexes import OpClass
+from django.db import migrations
+
+
+class PostgresOnlyMixin:
+    """Примесь для операций миграций, которые выполняются только на PostgreSQL.
+
+    Состояние моделей обновляется на любой СУБД, поэтому makemigrations
+    не видит расхождений, а тестовая SQLite просто пропускает DDL.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddIndexPostgres(PostgresOnlyMixin, migrations.AddIndex):
+    """Добавление индекса, специфичного для PostgreSQL (GIN, opclasses и т.п.)."""
+
+
+class RunSQLPostgres(PostgresOnlyMixin, migrations.RunSQL):
+    """Выполнение SQL, написанного для PostgreSQL (триггеры, функции)."""
+
+
+def is_postgres_index(index):
+    """Проверка, что индекс создаётся только на PostgreSQL (GIN, классы операторов)."""
+    return any(
+        [
+            bool(index.opclasses),
+            type(index).__module__.startswith("django.contrib.postgres"),
+            any(isinstance(expression, OpClass) for expression in index.expressions),
+        ]
+    )
+
+
+def without_postgres_indexes(state, app_label, model_name):
+    """Копия состояния, в котором у модели нет индексов только для PostgreSQL."""
+    state = state.clone()
+    model_state = state.models[app_label, model_name]
+    model_state.options["indexes"] = [
+        index
+        for index in model_state.options.get("indexes", [])
+        if not is_postgres_index(index)
+    ]
+    state.reload_model(app_label, model_name, delay=True)
+    return state
+
+
+class SkipPostgresIndexesMixin:
+    """Примесь для операций, при которых SQLite пересоздаёт таблицу.
+
+    SQLite заново создаёт все индексы модели из состояния миграций, в том числе
+    индексы только для PostgreSQL, DDL которых пропускал `AddIndexPostgres`.
+    На других СУБД операция выполняется с состоянием без таких индексов.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            from_state = without_postgres_indexes(
+                from_state, app_label, self.model_name_lower
+            )
+            to_state = without_postgres_indexes(
+                to_state, app_label, self.model_name_lower
+            )
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            from_state = without_postgres_indexes(
+                from_state, app_label, self.model_name_lower
+            )
+            to_state = without_postgres_indexes(
+                to_state, app_label, self.model_name_lower
+            )
+        super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class AlterFieldSkipPostgresIndexes(SkipPostgresIndexesMixin, migrations.AlterField):
+    """Изменение поля модели, у которой есть индексы только для PostgreSQL."""
@@ -0,0 +1,294 @@
+import base64
+import binascii
+import json
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .services import cached_for_owner, get_cached_notes, get_notes_count
+
+# Порядок выдачи для keyset-пагинации: сначала свежие записи, id разрешает
+# совпадения дат. По этим же полям построен индекс (owner, updated_at, id).
+KEYSET_ORDERING = ("-updated_at", "-id")
+
+
+class InvalidCursor(ValueError):
+    """Курсор повреждён или не может быть разобран."""
+
+
+def encode_cursor(note, reverse=False):
+    """Непрозрачный курсор: позиция записи (updated_at, id) и направление."""
+    position = {"u": note.updated_at.isoformat(), "i": note.pk, "r": int(reverse)}
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(queryset, cursor):
+    """Разбор курсора в (updated_at, id, reverse)."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+        field = queryset.model._meta.get_field("updated_at")
+        return field.to_python(position["u"]), int(position["i"]), bool(position["r"])
+    except (binascii.Error, ValueError, KeyError, TypeError, ValidationError):
+        raise InvalidCursor(cursor)
+
+
+def keyset_page(queryset, cursor, page_size):
+    """Страница записей после (или до) позиции курсора.
+
+    Вместо OFFSET и COUNT(*) используется условие по (updated_at, id), поэтому
+    любая по глубине страница стоит столько же, сколько первая. Избыточное
+    условие `updated_at <= t` (`>=` для обратного направления) нужно
+    планировщику: по нему дизъюнкция становится диапазоном в индексе
+    (owner, updated_at, id), а не фильтром по всему индексу.
+    Возвращает (записи, курсор следующей страницы, курсор предыдущей).
+    """
+    reverse = False
+    if cursor:
+        updated_at, pk, reverse = decode_cursor(queryset, cursor)
+        if reverse:
+            queryset = queryset.filter(
+                Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk),
+                updated_at__gte=updated_at,
+            )
+        else:
+            queryset = queryset.filter(
+                Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=pk),
+                updated_at__lte=updated_at,
+            )
+    ordering = KEYSET_ORDERING
+    if reverse:
+        ordering = tuple(field.lstrip("-") for field in KEYSET_ORDERING)
+    items = list(queryset.order_by(*ordering)[: page_size + 1])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+
+    if reverse:
+        items.reverse()
+        next_cursor = encode_cursor(items[-1]) if items else None
+        previous_cursor = encode_cursor(items[0], reverse=True) if has_more else None
+    else:
+        next_cursor = encode_cursor(items[-1]) if has_more else None
+        previous_cursor = (
+            encode_cursor(items[0], reverse=True) if cursor and items else None
+        )
+    return items, next_cursor, previous_cursor
+
+
+def is_cursor_mode(params):
+    """Проверка, запрошена ли keyset-пагинация (`?pagination=cursor` или `?cursor=`)."""
+    return params.get("pagination") == "cursor" or "cursor" in params
+
+
+class KeysetPagination(BasePagination):
+    """Keyset-пагинация DRF по (-updated_at, -id) с непрозрачными курсорами."""
+
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            items, self.next_cursor, self.previous_cursor = keyset_page(
+                queryset, request.query_params.get(self.cursor_query_param), self.page_size
+            )
+        except InvalidCursor:
+            raise NotFound("Некорректный курсор.")
+        return items
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_link(self.next_cursor),
+                "previous": self.get_link(self.previous_cursor),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+def estimate_count(queryset):
+    """Оценка количества строк планировщиком PostgreSQL (EXPLAIN без выполнения)."""
+    plan = json.loads(queryset.explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class ApproximatePage(Page):
+    """Страница выборки с приблизительным количеством записей."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+
+class ApproximateCountPaginator(Paginator):
+    """Paginator, который не выполняет точный COUNT(*) на больших выборках.
+
+    Для нефильтрованного списка владельца (`owner`) количество берётся из
+    денормализованного счётчика `NoteCounter`. Для отфильтрованных выборок
+    стратегия задаётся настройкой `NOTES_COUNT_STRATEGY`:
+    `capped` — подсчёт не дальше `NOTES_COUNT_CAP` ("10 000+"),
+    `estimate` — оценка планировщика PostgreSQL, `exact` — обычный COUNT(*).
+
+    Если задан `cache_key`, количество и записи страниц читаются через
+    версионируемый кэш сотрудника `cache_owner`.
+    """
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        orphans=0,
+        allow_empty_first_page=True,
+        owner=None,
+        cache_owner=None,
+        cache_key=None,
+    ):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.owner = owner
+        self.cache_owner = cache_owner
+        self.cache_key = cache_key
+        self.count_is_exact = True
+
+    def validate_number(self, number):
+        """Проверка номера страницы; при приблизительном количестве страницы
+        за его пределами не отклоняются."""
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self.count_is_exact or int(number) < 1:
+                raise
+            return int(number)
+
+    def page(self, number):
+        """Страница записей.
+
+        При приблизительном количестве последняя страница по нему неизвестна:
+        читается на одну запись больше размера страницы, и по ней определяется,
+        есть ли следующая.
+        """
+        number = self.validate_number(number)
+        if self.count_is_exact:
+            page = super().page(number)
+            if self.cache_key is not None:
+                page.object_list = get_cached_notes(
+                    self.cache_owner.pk,
+                    "%s:page:%s" % (self.cache_key, page.number),
+                    page.object_list,
+                )
+            return page
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page + 1
+        object_list = self.object_list[bottom:top]
+        if self.cache_key is not None:
+            object_list = get_cached_notes(
+                self.cache_owner.pk,
+                "%s:page:%s:next" % (self.cache_key, number),
+                object_list,
+            )
+        object_list = list(object_list)
+        if not object_list and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        return ApproximatePage(
+            object_list[: self.per_page],
+            number,
+            self,
+            has_next=len(object_list) > self.per_page,
+        )
+
+    @cached_property
+    def count(self):
+        if self.owner is not None:
+            return get_notes_count(self.owner)
+        if self.cache_key is not None:
+            count, self.count_is_exact = cached_for_owner(
+                self.cache_owner.pk,
+                "%s:count" % self.cache_key,
+                lambda: (self.get_count(), self.count_is_exact),
+            )
+            return count
+        return self.get_count()
+
+    def get_count(self):
+        """Подсчёт количества записей выборки по стратегии `NOTES_COUNT_STRATEGY`."""
+        strategy = settings.NOTES_COUNT_STRATEGY
+        queryset = self.object_list
+        if strategy == "estimate" and connections[queryset.db].vendor == "postgresql":
+            self.count_is_exact = False
+            return estimate_count(queryset)
+        if strategy in ("capped", "estimate"):
+            cap = settings.NOTES_COUNT_CAP
+            count = queryset[: cap + 1].count()
+            if count > cap:
+                self.count_is_exact = False
+                return cap
+            return count
+        return queryset.count()
+
+    @property
+    def count_display(self):
+        """Количество для вывода пользователю: "10 000+" для приблизительного."""
+        count = self.count
+        if self.count_is_exact:
+            return str(count)
+        return "{:,}+".format(count).replace(",", " ")
+
+
+class ApproximateCountPagination(PageNumberPagination):
+    """Постраничная пагинация DRF с дешёвым подсчётом количества записей.
+
+    Представление может определить `get_paginator_kwargs()`, чтобы передать
+    paginator'у владельца счётчика записей и ключ кэша страниц.
+    """
+
+    django_paginator_class = ApproximateCountPaginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        kwargs = {}
+        if view is not None and hasattr(view, "get_paginator_kwargs"):
+            kwargs = view.get_paginator_kwargs()
+        self.django_paginator_class = partial(ApproximateCountPaginator, **kwargs)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data["count_is_exact"] = self.page.paginator.count_is_exact
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_is_exact"] = {"type": "boolean"}
+        return response_schema
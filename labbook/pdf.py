@@ -0,0 +1,117 @@
+"""Рендеринг PDF-отчётов средствами Pillow.
+
+Модуль не импортирует Django: функции выполняются в отдельных процессах пула
+и получают только простые данные (строки, пути к файлам).
+"""
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Страница A4 при 150 dpi
+PAGE_SIZE = (1240, 1754)
+RESOLUTION = 150
+MARGIN = 100
+
+FONT_SIZES = {"title": 40, "heading": 32, "text": 24}
+
+
+def _load_font(path, size):
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+
+class PdfWriter:
+    """Постраничная запись отчёта в файл.
+
+    Заполненная страница сразу дописывается в PDF (`append=True`), поэтому
+    в памяти находится только текущая страница, сколько бы записей ни было
+    в отчёте.
+    """
+
+    def __init__(self, path, font_path):
+        self.path = path
+        self.fonts = {
+            style: (_load_font(font_path, size), size)
+            for style, size in FONT_SIZES.items()
+        }
+        self.width = PAGE_SIZE[0] - 2 * MARGIN
+        self.pages = 0
+        self.page = None
+
+    def new_page(self):
+        self.flush()
+        self.page = Image.new("RGB", PAGE_SIZE, "white")
+        self.draw = ImageDraw.Draw(self.page)
+        self.y = MARGIN
+
+    def flush(self):
+        if self.page is None:
+            return
+        self.page.save(self.path, "PDF", resolution=RESOLUTION, append=self.pages > 0)
+        self.pages += 1
+        self.page = None
+
+    def reserve(self, height):
+        """Переход на новую страницу, если блок высотой `height` не помещается."""
+        if self.page is None or self.y + height > PAGE_SIZE[1] - MARGIN:
+            self.new_page()
+
+    def wrap(self, value, font):
+        lines = []
+        for paragraph in str(value).splitlines() or [""]:
+            line = ""
+            for word in paragraph.split():
+                candidate = f"{line} {word}".strip()
+                if line and self.draw.textlength(candidate, font=font) > self.width:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = candidate
+            lines.append(line)
+        return lines
+
+    def text(self, value, style="text"):
+        font, size = self.fonts[style]
+        line_height = int(size * 1.4)
+        self.reserve(line_height)
+        for line in self.wrap(value, font):
+            self.reserve(line_height)
+            self.draw.text((MARGIN, self.y), line, font=font, fill="black")
+            self.y += line_height
+
+    def image(self, path):
+        try:
+            with Image.open(path) as picture:
+                picture = picture.convert("RGB")
+        except OSError:
+            self.text("Изображение недоступно.")
+            return
+        picture.thumbnail((self.width, (PAGE_SIZE[1] - 2 * MARGIN) // 2))
+        self.reserve(picture.height)
+        self.page.paste(picture, (MARGIN, self.y))
+        self.y += picture.height + MARGIN // 2
+
+
+def render_pdf(path, title, sections, font_path):
+    """Запись отчёта в файл `path`.
+
+    `sections` — список словарей с заголовком (`heading`), строками
+    "подпись — значение" (`rows`) и путём к изображению (`picture`);
+    каждая секция начинается с новой страницы.
+    """
+    writer = PdfWriter(path, font_path)
+    for index, section in enumerate(sections):
+        writer.new_page()
+        if index == 0:
+            writer.text(title, "title")
+        writer.text(section["heading"], "heading")
+        for label, value in section["rows"]:
+            writer.text(f"{label}: {value}")
+        if section.get("picture"):
+            writer.image(section["picture"])
+    if writer.page is None:
+        writer.new_page()
+        writer.text(title, "title")
+    writer.flush()
+    return writer.pages
@@ -0,0 +1,28 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def dumps_line(data):
+    """Один объект NDJSON: JSON в одну строку с переводом строки в конце."""
+    line = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+    return f"{line}\n".encode()
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Рендерер `application/x-ndjson`: по одному JSON-объекту на строку.
+
+    Список записей в этом формате отдаётся потоком (`labbook.export`),
+    а рендерер нужен для согласования формата и ответов остальных действий.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        return b"".join(dumps_line(item) for item in items)
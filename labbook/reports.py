@@ -0,0 +1,168 @@
+import datetime
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import ExperimentNote
+from .pdf import render_pdf
+from .tasks import get_executor
+
+logger = logging.getLogger(__name__)
+
+# Поля записи в отчёте после заголовка "код — название"
+REPORT_FIELDS = (
+    "status",
+    "version_of_protocol",
+    "latex_started_at",
+    "latex_completed_at",
+    "is_latex_loss",
+    "optical_density",
+    "signal_level",
+    "storage_buffer_ph",
+    "reminder_date",
+    "comments",
+    "updated_at",
+)
+
+READY, PENDING, FAILED = "ready", "pending", "failed"
+
+
+def _version(updated_at):
+    return int(updated_at.timestamp() * 1_000_000)
+
+
+def note_report_name(note):
+    """Имя файла отчёта по записи: id и время последнего изменения."""
+    return "%s/note-%s-%s.pdf" % (
+        settings.REPORTS["DIR"],
+        note.pk,
+        _version(note.updated_at),
+    )
+
+
+def get_project_notes(owner, code):
+    """Записи сотрудника, код проекта которых начинается с `code`."""
+    return ExperimentNote.objects.filter(
+        owner=owner, code_of_project__startswith=code
+    ).order_by("code_of_project")
+
+
+def project_report_name(owner, code):
+    """Имя файла отчёта по проекту по id и времени изменения всех его записей.
+
+    Возвращает None, если записей с таким кодом нет.
+    """
+    versions = list(get_project_notes(owner, code).values_list("pk", "updated_at"))
+    if not versions:
+        return None
+    digest = hashlib.md5(
+        " ".join(f"{pk}:{_version(updated_at)}" for pk, updated_at in versions).encode()
+    ).hexdigest()
+    return "%s/project-%s-%s-%s.pdf" % (
+        settings.REPORTS["DIR"],
+        owner.pk,
+        hashlib.md5(code.encode()).hexdigest()[:12],
+        digest,
+    )
+
+
+def _status_key(name):
+    return "report:%s" % name
+
+
+def get_report_status(name):
+    """Состояние отчёта: готов (файл сохранён), рендерится, ошибка или None."""
+    if default_storage.exists(name):
+        return READY
+    return cache.get(_status_key(name))
+
+
+def _report_value(value):
+    if value is None or value == "":
+        return "—"
+    if isinstance(value, bool):
+        return "да" if value else "нет"
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value).strftime("%d.%m.%Y %H:%M")
+    return value
+
+
+def _section(note):
+    """Данные записи для процесса пула: только строки и путь к изображению."""
+    picture = None
+    if note.picture:
+        try:
+            picture = note.picture.path
+        except NotImplementedError:
+            pass
+    return {
+        "heading": f"{note.code_of_project} — {note.title}",
+        "rows": [
+            (
+                str(ExperimentNote._meta.get_field(name).verbose_name),
+                str(_report_value(getattr(note, name))),
+            )
+            for name in REPORT_FIELDS
+        ],
+        "picture": picture,
+    }
+
+
+def _remove_outdated(name):
+    """Удаление отчётов того же объекта по прежним версиям записей."""
+    directory, filename = os.path.split(name)
+    prefix = filename.rsplit("-", 1)[0] + "-"
+    for other in default_storage.listdir(directory)[1]:
+        if other.startswith(prefix) and other != filename:
+            default_storage.delete(os.path.join(directory, other))
+
+
+def _finish(name, path, future):
+    """Сохранение готового файла в хранилище (вызывается по завершении рендеринга)."""
+    try:
+        future.result()
+        if not default_storage.exists(name):
+            with open(path, "rb") as file:
+                default_storage.save(name, File(file))
+        _remove_outdated(name)
+        cache.delete(_status_key(name))
+    except Exception:
+        logger.exception("Не удалось построить отчёт %s", name)
+        cache.set(_status_key(name), FAILED, settings.REPORTS["PENDING_TIMEOUT"])
+    finally:
+        os.remove(path)
+
+
+def request_report(name, title, notes):
+    """Запуск рендеринга отчёта, если его ещё нет.
+
+    Готовый отчёт не рендерится повторно: имя файла меняется только вместе с
+    `updated_at` записей. Рендеринг запускает только процесс, первым
+    отметивший отчёт как рендерящийся (`cache.add`), остальные запросы
+    получают состояние `pending`. `notes` — queryset или список записей,
+    читается только при запуске рендеринга. Возвращает состояние отчёта.
+    """
+    status = get_report_status(name)
+    if status is not None:
+        return status
+    options = settings.REPORTS
+    if not cache.add(_status_key(name), PENDING, options["PENDING_TIMEOUT"]):
+        return get_report_status(name)
+
+    try:
+        sections = [_section(note) for note in notes]
+        descriptor, path = tempfile.mkstemp(suffix=".pdf")
+        os.close(descriptor)
+    except Exception:
+        cache.delete(_status_key(name))
+        raise
+    future = get_executor().submit(render_pdf, path, title, sections, options["FONT"])
+    future.add_done_callback(lambda future: _finish(name, path, future))
+    return get_report_status(name) or PENDING
@@ -0,0 +1,92 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import CharField, F, Q
+from django.db.models.functions import Greatest
+from django.db.models.lookups import IContains
+
+# Конфигурации полнотекстового поиска: русская морфология для текста
+# и "simple" для кодов проектов, латиницы и чисел.
+SEARCH_CONFIGS = ("russian", "simple")
+
+
+@CharField.register_lookup
+class ILikeContains(IContains):
+    """Поиск подстроки без учёта регистра через `ILIKE` по самому столбцу.
+
+    Стандартный `icontains` на PostgreSQL сравнивает `UPPER("столбец"::text)`,
+    и GIN-индекс с `gin_trgm_ops` по столбцу для него не используется.
+    На остальных СУБД работает как `icontains`.
+    """
+
+    lookup_name = "ilike_contains"
+
+    def get_rhs_op(self, connection, rhs):
+        if connection.vendor == "postgresql":
+            return "ILIKE %s" % rhs
+        return connection.operators["icontains"] % rhs
+
+
+def is_postgres(queryset):
+    """Проверка, что запрос выполняется на PostgreSQL."""
+    return connections[queryset.db].vendor == "postgresql"
+
+
+def build_search_query(search_query):
+    """Построение запроса tsquery сразу по всем конфигурациям поиска."""
+    query = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(search_query, config=config, search_type="websearch")
+        query = part if query is None else query | part
+    return query
+
+
+def search_notes(queryset, search_query):
+    """Поиск по записям об экспериментах.
+
+    На PostgreSQL используется столбец `search_vector` (GIN-индекс), результаты
+    сортируются по `ts_rank`. Фрагменты кода проекта ("NEW-1") дополнительно
+    ищутся через ILIKE по триграммному индексу. На остальных СУБД (тестовая SQLite) остаётся
+    прежний поиск подстроки в `title` и `code_of_project`.
+    """
+    if not search_query:
+        return queryset
+    if not is_postgres(queryset):
+        return queryset.filter(
+            Q(title__icontains=search_query) | Q(code_of_project__icontains=search_query)
+        )
+    query = build_search_query(search_query)
+    return (
+        queryset.filter(
+            Q(search_vector=query) | Q(code_of_project__ilike_contains=search_query)
+        )
+        .annotate(rank=SearchRank(F("search_vector"), query))
+        .order_by("-rank", *queryset.query.order_by)
+    )
+
+
+def fuzzy_search_notes(queryset, search_query):
+    """Нечёткий поиск ("возможно, вы имели в виду") по `code_of_project` и `title`.
+
+    Использует операторы pg_trgm (`%>`) и GIN-индексы с `gin_trgm_ops`,
+    результаты сортируются по сходству. Без PostgreSQL сводится к `search_notes`.
+    """
+    if not search_query:
+        return queryset
+    if not is_postgres(queryset):
+        return search_notes(queryset, search_query)
+    return (
+        queryset.filter(
+            Q(code_of_project__trigram_word_similar=search_query) | Q(title__trigram_word_similar=search_query)
+        )
+        .annotate(
+            similarity=Greatest(
+                TrigramWordSimilarity(search_query, "code_of_project"),
+                TrigramWordSimilarity(search_query, "title"),
+            )
+        )
+        .order_by("-similarity", *queryset.query.order_by)
+    )
@@ -1,9 +1,194 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import ExperimentNote
+from .models import NOTE_STATUSES, ExperimentNote
+from .thumbnails import thumbnail_url
 
+# Поля, которые можно изменить массовым PATCH, и поля с приращением
+BULK_UPDATE_FIELDS = (
+    "title",
+    "comments",
+    "status",
+    "version_of_protocol",
+    "latex_started_at",
+    "latex_completed_at",
+    "is_latex_loss",
+    "optical_density",
+    "signal_level",
+    "storage_buffer_ph",
+    "reminder_date",
+)
+BULK_INCREMENT_FIELDS = ("version_of_protocol",)
+
+
+def parse_fieldset(value):
+    """Разбор списка полей из параметра запроса (`?fields=id,title`)."""
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """Сериализатор с выбором полей: `fields` оставляет только перечисленные,
+    `omit` убирает перечисленные. Неизвестные имена полей игнорируются."""
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit or ():
+            self.fields.pop(name, None)
+
+
+class ThumbnailField(serializers.ReadOnlyField):
+    """Абсолютный адрес миниатюры изображения (`source` — поле изображения)."""
+
+    def __init__(self, variant, **kwargs):
+        self.variant = variant
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        url = thumbnail_url(value, self.variant)
+        request = self.context.get("request")
+        if url and request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class ExperimentNoteSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    picture_thumbnail = ThumbnailField("thumb", source="picture")
+    picture_preview = ThumbnailField("preview", source="picture")
 
-class ExperimentNoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = ExperimentNote
-        fields = "__all__"
+        exclude = ("search_vector", "picture_width")
         read_only_fields = ("id", "owner", "created_at", "updated_at")
+
+
+class ExperimentNoteBulkSerializer(ExperimentNoteSerializer):
+    """Сериализатор записи для массового создания.
+
+    Уникальность `code_of_project` проверяется не для каждой записи отдельно,
+    а одним запросом на весь пакет (см. `labbook.bulk`).
+    """
+
+    class Meta(ExperimentNoteSerializer.Meta):
+        extra_kwargs = {"code_of_project": {"validators": []}}
+
+
+class ExperimentNoteBulkUpdateSerializer(serializers.Serializer):
+    """Запрос массового изменения записей: id, новые значения полей,
+    приращения числовых полей и статус, из которого переводятся записи."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.NOTES_BULK_MAX_SIZE,
+    )
+    changes = serializers.DictField(required=False, default=dict)
+    increment = serializers.DictField(
+        child=serializers.IntegerField(), required=False, default=dict
+    )
+    from_status = serializers.ChoiceField(choices=NOTE_STATUSES, required=False)
+
+    def validate_changes(self, value):
+        unknown = sorted(set(value) - set(BULK_UPDATE_FIELDS))
+        if unknown:
+            raise serializers.ValidationError(
+                f"Поля нельзя изменять массово: {', '.join(unknown)}."
+            )
+        serializer = ExperimentNoteSerializer(
+            data=value, partial=True, fields=BULK_UPDATE_FIELDS
+        )
+        if not serializer.is_valid():
+            raise serializers.ValidationError(serializer.errors)
+        if (
+            serializer.validated_data.get("status", NOTE_STATUSES[0])
+            not in NOTE_STATUSES
+        ):
+            raise serializers.ValidationError({"status": ["Неизвестный статус."]})
+        return serializer.validated_data
+
+    def validate_increment(self, value):
+        unknown = sorted(set(value) - set(BULK_INCREMENT_FIELDS))
+        if unknown:
+            raise serializers.ValidationError(
+                f"Приращение не поддерживается для полей: {', '.join(unknown)}."
+            )
+        return value
+
+    def validate(self, attrs):
+        if not attrs["changes"] and not attrs["increment"]:
+            raise serializers.ValidationError("Укажите `changes` или `increment`.")
+        if set(attrs["changes"]) & set(attrs["increment"]):
+            raise serializers.ValidationError(
+                "Поле нельзя одновременно задать и увеличить."
+            )
+        self.validate_latex_period(attrs)
+        return attrs
+
+    def validate_latex_period(self, attrs):
+        """Проверка, что завершение активации не раньше начала (как в `ExperimentNote.clean`).
+
+        Если изменяется только одна из дат, она сравнивается с сохранёнными
+        значениями изменяемых записей сотрудника из контекста (`request`).
+        """
+        changes = attrs["changes"]
+        started = changes.get("latex_started_at")
+        completed = changes.get("latex_completed_at")
+        if "latex_started_at" in changes and "latex_completed_at" in changes:
+            if started and completed and completed < started:
+                raise self.latex_period_error()
+            return
+        if started:
+            conflicts = self.get_target_notes(attrs).filter(latex_completed_at__lt=started)
+        elif completed:
+            conflicts = self.get_target_notes(attrs).filter(latex_started_at__gt=completed)
+        else:
+            return
+        ids = list(conflicts.values_list("pk", flat=True))
+        if ids:
+            raise self.latex_period_error(ids)
+
+    def latex_period_error(self, ids=()):
+        message = "Завершение активации не может быть раньше начала."
+        if ids:
+            message += f" Записи: {', '.join(map(str, ids))}."
+        return serializers.ValidationError(
+            {"changes": {"latex_completed_at": [message]}}
+        )
+
+    def get_target_notes(self, attrs):
+        """Записи сотрудника, которые затронет массовое изменение."""
+        queryset = ExperimentNote.objects.filter(
+            owner=self.context["request"].user, pk__in=attrs["ids"]
+        )
+        if attrs.get("from_status") is not None:
+            queryset = queryset.filter(status=attrs["from_status"])
+        return queryset
+
+
+class ExperimentNoteListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Облегчённый сериализатор для таблиц списка и поиска
+    (без `comments` и полноразмерных изображений, только миниатюра)."""
+
+    picture_thumbnail = ThumbnailField("thumb", source="picture")
+
+    class Meta:
+        model = ExperimentNote
+        fields = (
+            "id",
+            "code_of_project",
+            "title",
+            "status",
+            "version_of_protocol",
+            "updated_at",
+            "picture_thumbnail",
+        )
+        read_only_fields = fields
+
+
+class ExperimentNoteAutocompleteSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ExperimentNote
+        fields = ("id", "code_of_project", "title")
@@ -1,16 +1,296 @@
+import hashlib
+import time
+
 from django.core.cache import cache
 from django.conf import settings
-from .models import ExperimentNote
-
-
-def get_from_cache():
-    """Получение данных по записям из кэша, если кэш пуст берем из БД."""
-    if not settings.CACHES:
-        return ExperimentNote.objects.all()
-    key = "mailing_list"
-    cache_data = cache.get(key)
-    if cache_data is not None:
-        return cache_data
-    cache_data = ExperimentNote.objects.all()
-    cache.set(key, cache_data)
-    return cache_data
+from django.utils.http import urlencode
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .cache import (
+    get_local_or_compute,
+    get_or_compute,
+    instance_values,
+    invalidate_local,
+)
+from .models import DailyNoteActivity, ExperimentNote, NoteCounter
+
+
+def _version_key(owner_id):
+    return "notes:%s:version" % owner_id
+
+
+def get_owner_version(owner_id):
+    """Текущая версия кэша записей сотрудника.
+
+    Если версии в кэше нет (первый запрос или вытеснение), она начинается
+    с текущего времени, чтобы не совпасть с версиями уже лежащих в кэше ключей.
+    """
+    key = _version_key(owner_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_owner_version(owner_id):
+    """Инвалидация всех закэшированных данных сотрудника сменой версии."""
+    if owner_id is None:
+        return
+    try:
+        cache.incr(_version_key(owner_id))
+    except ValueError:
+        cache.set(_version_key(owner_id), time.time_ns(), None)
+
+
+def invalidate_notes(owner_id, pks=(), activity_keys=()):
+    """Инвалидация кэшей после изменения записей сотрудника.
+
+    Версия кэша владельца меняется сразу и ещё раз после фиксации транзакции,
+    чтобы в кэш не попали данные, прочитанные до коммита. Из кэша процессов
+    удаляются изменённые записи и счётчики главной страницы за затронутые дни.
+    """
+    bump_owner_version(owner_id)
+    transaction.on_commit(lambda: bump_owner_version(owner_id))
+    invalidate_local(
+        *[note_cache_key(owner_id, pk) for pk in pks],
+        *{
+            home_stats_key(*activity_key)
+            for activity_key in activity_keys
+            if activity_key is not None and activity_key[0] is not None
+        },
+    )
+
+
+def owner_cache_key(owner_id, key):
+    """Ключ кэша сотрудника с текущей версией: `notes:<owner>:v<version>:<key>`."""
+    return "notes:%s:v%s:%s" % (owner_id, get_owner_version(owner_id), key)
+
+
+def cached_for_owner(owner_id, key, compute, timeout=None):
+    """Чтение значения из кэша сотрудника; при промахе вызывается `compute()`.
+
+    Одновременные промахи по одному ключу приводят к одному пересчёту.
+    """
+    return get_or_compute(
+        owner_cache_key(owner_id, key),
+        compute,
+        timeout or settings.NOTES_CACHE_TIMEOUT,
+    )
+
+
+def pack_notes(notes):
+    """Компактное представление записей для кэша: имена столбцов и кортежи значений.
+
+    Сохраняются только прочитанные из базы столбцы, отложенные (`only`/`defer`) пропускаются.
+    """
+    if not notes:
+        return ((), [])
+    deferred = notes[0].get_deferred_fields()
+    attnames = tuple(
+        field.attname
+        for field in ExperimentNote._meta.concrete_fields
+        if field.attname not in deferred
+    )
+    return attnames, [instance_values(note, attnames) for note in notes]
+
+
+def unpack_notes(packed):
+    """Восстановление объектов записей из компактного представления."""
+    attnames, rows = packed
+    return [ExperimentNote.from_db("default", attnames, row) for row in rows]
+
+
+def get_cached_notes(owner_id, key, queryset):
+    """Список записей сотрудника через кэш; `queryset` выполняется только при промахе."""
+    return unpack_notes(cached_for_owner(owner_id, key, lambda: pack_notes(list(queryset))))
+
+
+def note_cache_key(owner_id, pk):
+    """Ключ кэша процесса для записи сотрудника."""
+    return "note:%s:%s" % (owner_id, pk)
+
+
+def get_cached_note(owner_id, pk):
+    """Запись сотрудника по pk через кэш процесса и кэш сотрудника.
+
+    Чужие записи не читаются и не кэшируются: для них возвращается None.
+    """
+    packed = get_local_or_compute(
+        note_cache_key(owner_id, pk),
+        lambda: cached_for_owner(
+            owner_id,
+            "note:%s" % pk,
+            lambda: pack_notes(
+                list(ExperimentNote.objects.filter(pk=pk, owner_id=owner_id))
+            ),
+        ),
+    )
+    notes = unpack_notes(packed)
+    return notes[0] if notes else None
+
+
+def request_cache_key(request, ignore=("page",)):
+    """Ключ кэша для выборки, заданной путём и параметрами запроса."""
+    params = sorted(
+        (name, value)
+        for name, values in request.GET.lists()
+        if name not in ignore
+        for value in values
+    )
+    raw = "%s?%s" % (request.path, urlencode(params))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def autocomplete_notes(owner, prefix, limit=None):
+    """Подсказки для поиска: первые записи, у которых код проекта или название
+    начинаются с `prefix`. Повторные запросы владельца берутся из кэша."""
+    limit = limit or settings.AUTOCOMPLETE_LIMIT
+    prefix = prefix.strip()
+    if not prefix:
+        return []
+    return cached_for_owner(
+        owner.pk,
+        "autocomplete:%s:%s" % (limit, prefix.lower()),
+        lambda: list(
+            ExperimentNote.objects.filter(owner=owner)
+            .filter(Q(code_of_project__istartswith=prefix) | Q(title__istartswith=prefix))
+            .order_by("code_of_project")
+            .values("id", "code_of_project", "title")[:limit]
+        ),
+        settings.AUTOCOMPLETE_CACHE_TIMEOUT,
+    )
+
+
+def change_note_counter(owner_id, delta):
+    """Изменение денормализованного счётчика записей сотрудника на `delta`.
+
+    Если счётчика ещё нет, он создаётся с точным количеством записей.
+    """
+    if owner_id is None:
+        return
+    updated = NoteCounter.objects.filter(owner_id=owner_id).update(
+        notes_count=F("notes_count") + delta
+    )
+    if not updated:
+        NoteCounter.objects.get_or_create(
+            owner_id=owner_id,
+            defaults={
+                "notes_count": ExperimentNote.objects.filter(owner_id=owner_id).count()
+            },
+        )
+
+
+def get_notes_count(owner):
+    """Количество записей сотрудника без COUNT(*) по таблице записей."""
+    counter = NoteCounter.objects.filter(owner=owner).values_list(
+        "notes_count", flat=True
+    ).first()
+    if counter is None:
+        change_note_counter(owner.pk, 0)
+        return ExperimentNote.objects.filter(owner=owner).count()
+    return counter
+
+
+def change_daily_activity(activity_key, delta):
+    """Изменение дневного счётчика активности сотрудника и общего итога за день.
+
+    Если строку за день одновременно создают несколько процессов, проигравший
+    `get_or_create` получает чужую строку и применяет своё изменение повторным
+    UPDATE, чтобы оно не потерялось.
+    """
+    if activity_key is None:
+        return
+    owner_id, day = activity_key
+    for owner in {owner_id, None}:
+        rows = DailyNoteActivity.objects.filter(owner_id=owner, day=day)
+        if rows.update(notes_count=F("notes_count") + delta):
+            continue
+        _, created = DailyNoteActivity.objects.get_or_create(
+            owner_id=owner, day=day, defaults={"notes_count": max(delta, 0)}
+        )
+        if not created:
+            rows.update(notes_count=F("notes_count") + delta)
+
+
+def get_daily_activity(owner=None, day=None):
+    """Количество записей, изменённых за день: сотрудником `owner` или всеми (`None`)."""
+    day = day or timezone.localdate()
+    count = (
+        DailyNoteActivity.objects.filter(owner=owner, day=day)
+        .values_list("notes_count", flat=True)
+        .first()
+    )
+    return count or 0
+
+
+def get_home_stats(user):
+    """Статистика главной страницы: записи, изменённые сегодня всеми и сотрудником.
+
+    Общее число кэшируется на `HOME_STATS_CACHE_TIMEOUT` секунд, число сотрудника —
+    в его версионируемом кэше; при истечении пересчитывает один процесс.
+    Оба значения дополнительно держатся в кэше процесса.
+    """
+    today = timezone.localdate()
+    return {
+        "count_entries": get_local_or_compute(
+            "home:%s" % today.isoformat(),
+            lambda: get_or_compute(
+                "home:count_entries:%s" % today.isoformat(),
+                get_daily_activity,
+                settings.HOME_STATS_CACHE_TIMEOUT,
+            ),
+            settings.HOME_STATS_CACHE_TIMEOUT,
+        ),
+        "count_own_entries": get_local_or_compute(
+            home_stats_key(user.pk, today),
+            lambda: cached_for_owner(
+                user.pk,
+                "home:count_own_entries:%s" % today.isoformat(),
+                lambda: get_daily_activity(user),
+            ),
+        ),
+    }
+
+
+def home_stats_key(owner_id, day):
+    """Ключ кэша процесса для числа записей сотрудника, изменённых за день."""
+    return "home:%s:%s" % (owner_id, day.isoformat())
+
+
+@transaction.atomic
+def rebuild_note_counters():
+    """Полный пересчёт счётчиков записей и дневной активности по таблице записей."""
+    NoteCounter.objects.all().delete()
+    NoteCounter.objects.bulk_create(
+        NoteCounter(owner_id=row["owner"], notes_count=row["total"])
+        for row in ExperimentNote.objects.filter(owner__isnull=False)
+        .values("owner")
+        .annotate(total=Count("pk"))
+        .order_by()
+    )
+
+    days = ExperimentNote.objects.annotate(
+        day=TruncDate("updated_at", tzinfo=timezone.get_current_timezone())
+    ).order_by()
+    activity = {
+        (row["owner"], row["day"]): row["total"]
+        for row in days.values("owner", "day").annotate(total=Count("pk"))
+    }
+    activity.update(
+        ((None, row["day"]), row["total"])
+        for row in days.values("day").annotate(total=Count("pk"))
+    )
+    for owner_id in {owner_id for owner_id, _ in activity}:
+        bump_owner_version(owner_id)
+    DailyNoteActivity.objects.all().delete()
+    DailyNoteActivity.objects.bulk_create(
+        (
+            DailyNoteActivity(owner_id=owner_id, day=day, notes_count=count)
+            for (owner_id, day), count in activity.items()
+        ),
+        batch_size=1000,
+    )
+    return len(activity)
@@ -0,0 +1,55 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .blobs import release_file_ref, update_file_refs
+from .models import ExperimentNote
+from .services import change_daily_activity, change_note_counter, invalidate_notes
+from .thumbnails import record_image_width, schedule_thumbnails
+
+
+@receiver(post_save, sender=ExperimentNote)
+def note_saved(sender, instance, created, raw=False, **kwargs):
+    """Обновление счётчиков записей, дневной активности и кэша владельца при сохранении записи."""
+    if raw:
+        return
+    activity_key = instance.get_activity_key()
+    loaded_activity = getattr(instance, "_loaded_activity", None)
+    if created:
+        change_note_counter(instance.owner_id, 1)
+        change_daily_activity(activity_key, 1)
+    elif loaded_activity is not None and loaded_activity != activity_key:
+        change_daily_activity(loaded_activity, -1)
+        change_daily_activity(activity_key, 1)
+    instance._loaded_activity = activity_key
+    invalidate_notes(instance.owner_id, [instance.pk], [loaded_activity, activity_key])
+
+
+@receiver(pre_save, sender=ExperimentNote)
+def note_picture_changing(sender, instance, raw=False, **kwargs):
+    """Запись ширины нового изображения записи (по ней выбираются его копии)."""
+    if not raw:
+        record_image_width(instance, "picture")
+
+
+@receiver(post_save, sender=ExperimentNote)
+def note_picture_saved(sender, instance, created, raw=False, **kwargs):
+    """Учёт ссылки на файл изображения записи и создание его уменьшенных копий
+    вне обработки запроса."""
+    if not raw:
+        update_file_refs(instance, "picture", created)
+        schedule_thumbnails(instance.picture)
+
+
+@receiver(post_delete, sender=ExperimentNote)
+def note_deleted(sender, instance, **kwargs):
+    """Обновление счётчиков записей, дневной активности и кэша владельца при удалении записи."""
+    activity_key = getattr(instance, "_loaded_activity", instance.get_activity_key())
+    change_note_counter(instance.owner_id, -1)
+    change_daily_activity(activity_key, -1)
+    invalidate_notes(instance.owner_id, [instance.pk], [activity_key])
+
+
+@receiver(post_delete, sender=ExperimentNote)
+def note_picture_deleted(sender, instance, **kwargs):
+    """Снятие ссылки на файл изображения удалённой записи."""
+    release_file_ref(instance, "picture")
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище изображений по содержимому.
+
+    Файл при записи на диск хэшируется (SHA-256) и сохраняется под именем
+    `blobs/<2 символа>/<хэш>.<расширение>`. Одинаковые загрузки хранятся один
+    раз, а содержимое файла по имени никогда не меняется, поэтому его адрес
+    можно кэшировать навсегда. `upload_to` поля на имя файла не влияет.
+    Ссылки на файлы считаются в `MediaBlob` (см. `labbook.blobs`).
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Имя определяется содержимым в `_save`, совпадение имён — это дедупликация
+        return name
+
+    def blob_name(self, digest, name):
+        extension = os.path.splitext(name)[1].lower()
+        return "%s/%s/%s%s" % (
+            settings.MEDIA_BLOBS["DIR"],
+            digest[:2],
+            digest,
+            extension,
+        )
+
+    def _save(self, name, content):
+        directory = self.path(settings.MEDIA_BLOBS["DIR"])
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".upload")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    file.write(chunk)
+            blob = self.blob_name(digest.hexdigest(), name)
+            path = self.path(blob)
+            if os.path.exists(path):
+                # Повторная загрузка того же содержимого: файл отмечается как
+                # свежий, чтобы `gc_media_blobs` не удалил его, пока объект
+                # со ссылкой на него ещё не сохранён
+                os.remove(temporary)
+                os.utime(path)
+                from .blobs import touch_blob
+
+                touch_blob(blob)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temporary, self.file_permissions_mode)
+                os.replace(temporary, path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return blob
+
+
+blob_storage = ContentAddressedStorage()
+
+
+def get_blob_storage():
+    """Хранилище полей изображений (вызываемый объект, чтобы не попадать в миграции
+    вместе с настройками)."""
+    return blob_storage
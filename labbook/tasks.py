@@ -0,0 +1,43 @@
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from django.conf import settings
+
+
+class SyncExecutor:
+    """Исполнитель, который выполняет задачу сразу в вызывающем процессе (тесты)."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Пул процессов для фоновой обработки (PDF-отчёты, миниатюры изображений).
+
+    Создаётся при первом обращении в рабочем процессе gunicorn. Процессы
+    пула запускаются через `spawn` и не наследуют соединения с базой и Redis,
+    поэтому задачам передаются только простые данные: строки и пути к файлам.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                options = settings.TASKS
+                if options["EXECUTOR"] == "sync":
+                    _executor = SyncExecutor()
+                else:
+                    _executor = ProcessPoolExecutor(
+                        max_workers=options["MAX_WORKERS"],
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+    return _executor
@@ -1,4 +1,10 @@
 from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from labbook.thumbnails import image_sources, thumbnail_url
 
 
 register = template.Library()
@@ -9,3 +15,63 @@ def media_filter(path):
     if path:
         return f"/media/{path}"
     return "#"
+
+
+@register.inclusion_tag("responsive_image.html")
+def responsive_image(
+    file, sizes="100vw", css_class="", style="", alt="", variant="thumb"
+):
+    """Изображение в `<picture>` с копиями AVIF/WebP/JPEG разной ширины.
+
+    Браузер выбирает формат и ширину по `sizes`; `src` — JPEG-копия размера
+    `variant`. Пока копии не созданы, показывается оригинал. Заменяет
+    `media_filter` для встроенных изображений.
+    """
+    return {
+        "file": file,
+        "sources": image_sources(file),
+        "src": thumbnail_url(file, variant),
+        "original": media_filter(file),
+        "sizes": sizes,
+        "css_class": css_class,
+        "style": style,
+        "alt": alt,
+    }
+
+
+@register.simple_tag()
+def elided_page_range(page_obj):
+    """Номера страниц вокруг текущей с многоточиями вместо длинных диапазонов."""
+    return page_obj.paginator.get_elided_page_range(page_obj.number)
+
+
+def note_row_key(note, user):
+    """Ключ кэша строки таблицы: запись, время её изменения, ширина изображения
+    (её дописывает `generate_thumbnails` без изменения записи) и вид для администратора."""
+    return "note_row:%s:%s:%s:%d" % (
+        note.pk,
+        note.updated_at.isoformat(),
+        note.picture_width,
+        user.is_superuser,
+    )
+
+
+@register.simple_tag(takes_context=True)
+def note_rows(context, notes):
+    """Строки таблицы записей из кэша фрагментов.
+
+    Все строки страницы читаются одним `cache.get_many`, шаблон `note_row.html`
+    отрисовывается только для записей, изменившихся с прошлого показа.
+    """
+    user = context["user"]
+    notes = {note_row_key(note, user): note for note in notes}
+    rows = cache.get_many(notes)
+    missing = {
+        key: render_to_string("note_row.html", {"object": note, "user": user})
+        for key, note in notes.items()
+        if key not in rows
+    }
+    if missing:
+        cache.set_many(missing, settings.NOTE_ROW_CACHE_TIMEOUT)
+        rows.update(missing)
+    return mark_safe("".join(rows[key] for key in notes))
@@ -1,11 +1,33 @@
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
 from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import skipUnless
 from datetime import timedelta
 from django.core.exceptions import PermissionDenied
-from django.test import RequestFactory
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.utils import timezone
+from PIL import Image
 from rest_framework.test import APITestCase
-from .models import ExperimentNote
+from .models import ExperimentNote, MediaBlob, NoteCounter
 from .forms import ExperimentNoteForm
+from .pagination import ApproximateCountPaginator
+from .cache import get_local_cache, get_or_compute
+from .search import search_notes
+from .storage import blob_storage
+from .thumbnails import image_sources, thumbnail_url
+from .services import get_daily_activity
 from .views import (
     ExperimentNoteCreateView,
     ExperimentNoteUpdateView,
@@ -20,6 +42,8 @@ class TestCase(APITestCase):
 
     def setUp(self):
         """Задает начальные данные для тестов."""
+        cache.clear()
+        get_local_cache().clear()
         self.factory = RequestFactory()
 
         self.user1 = Employee.objects.create_user(
@@ -120,6 +144,8 @@ class TestCase(APITestCase):
         ExperimentNote.objects.filter(pk=n3.pk).update(
             updated_at=timezone.now() - timedelta(days=1)
         )
+        # Массовый update минует сигналы — счётчики пересчитываются командой
+        call_command("rebuild_note_counters", stdout=StringIO())
 
         request = self.factory.get("/home/")
         request.user = self.user1
@@ -132,3 +158,762 @@ class TestCase(APITestCase):
         form = ExperimentNoteForm()
         for fld in ("owner", "created_at", "updated_at"):
             self.assertNotIn(fld, form.fields)
+
+    def test_search_matches_title_and_code(self):
+        """Тест на поиск по записям в HTML и API"""
+        self._create_note(self.user1, code_of_project="LTX-7", title="Латекс")
+        self._create_note(self.user1, code_of_project="BUF-1", title="Буфер")
+        self._create_note(self.user2, code_of_project="LTX-8", title="Чужая")
+
+        response = self.client.get("/api/notes/search/", {"search_query": "LTX"})
+        self.assertEqual(response.status_code, 200)
+        codes = [row["code_of_project"] for row in response.data["results"]]
+        self.assertEqual(codes, ["LTX-7"])
+        self.assertNotIn("search_vector", response.data["results"][0])
+
+        response = self.client.get("/notes/search/", {"search_query": "Буфер"})
+        self.assertEqual(response.status_code, 200)
+        codes = [note.code_of_project for note in response.context["experiment_notes"]]
+        self.assertEqual(codes, ["BUF-1"])
+
+    @skipUnless(connection.vendor == "postgresql", "нечёткий поиск (pg_trgm) есть только в PostgreSQL")
+    def test_fuzzy_search_mode(self):
+        """Тест на режим нечёткого поиска: запись находится по названию с опечаткой"""
+        self._create_note(self.user1, code_of_project="NEW-12", title="Центрифугирование")
+        self._create_note(self.user1, code_of_project="OLD-3", title="Буфер")
+        self._create_note(self.user2, code_of_project="NEW-13", title="Центрифугирование")
+
+        response = self.client.get(
+            "/api/notes/search/", {"search_query": "Центрифугирвание", "mode": "fuzzy"}
+        )
+        self.assertEqual(response.status_code, 200)
+        codes = [row["code_of_project"] for row in response.data["results"]]
+        self.assertEqual(codes, ["NEW-12"])
+        self.assertFalse(search_notes(ExperimentNote.objects.all(), "Центрифугирвание").exists())
+
+    def test_autocomplete_returns_prefix_matches(self):
+        """Тест на автодополнение по началу кода проекта и названия"""
+        note = self._create_note(self.user1, code_of_project="NEW-1", title="Латекс")
+        self._create_note(self.user1, code_of_project="OLD-1", title="Новый буфер")
+        self._create_note(self.user2, code_of_project="NEW-2", title="Чужая")
+
+        response = self.client.get("/api/notes/autocomplete/", {"q": "new"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data,
+            [{"id": note.pk, "code_of_project": "NEW-1", "title": "Латекс"}],
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/notes/autocomplete/", {"q": "NEW"})
+        self.assertEqual(len(response.data), 1)
+        self.assertFalse(
+            [q for q in queries.captured_queries if "labbook_experimentnote" in q["sql"]]
+        )
+
+    def test_list_filters_and_facet_counts(self):
+        """Тест на фасетную фильтрацию списка записей и подсчёт фасетов одним запросом"""
+        self._create_note(self.user1, code_of_project="F-1", status="draft")
+        self._create_note(
+            self.user1, code_of_project="F-2", status="review", is_latex_loss=True
+        )
+        self._create_note(
+            self.user1,
+            code_of_project="F-3",
+            status="draft",
+            optical_density=Decimal("0.50"),
+            version_of_protocol=7,
+        )
+        self._create_note(self.user2, code_of_project="F-4", status="draft", version_of_protocol=9)
+
+        response = self.client.get("/api/notes/", {"status": "draft"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(row["code_of_project"] for row in response.data["results"]),
+            ["F-1", "F-3"],
+        )
+        facets = response.data["facets"]
+        self.assertEqual(facets["status"]["draft"], 2)
+        self.assertEqual(facets["status"]["review"], 1)
+        self.assertEqual(facets["is_latex_loss"], {"true": 0, "false": 2})
+        self.assertEqual(facets["optical_density"]["0.00–0.99"], 1)
+        self.assertEqual(facets["version_of_protocol"], {"1": 1, "7": 1})
+
+        response = self.client.get(
+            "/api/notes/", {"optical_density_min": "1", "is_latex_loss": "false"}
+        )
+        self.assertEqual(
+            [row["code_of_project"] for row in response.data["results"]], ["F-1"]
+        )
+
+        response = self.client.get("/notes/", {"status": "review"})
+        self.assertEqual(
+            [note.code_of_project for note in response.context["experiment_notes"]],
+            ["F-2"],
+        )
+        status_facet = response.context["facets"][0]
+        self.assertEqual(status_facet["name"], "status")
+        self.assertTrue(status_facet["values"][2]["active"])
+
+    def test_cursor_pagination_walks_all_notes(self):
+        """Тест на keyset-пагинацию API и режим «Загрузить ещё» в HTML"""
+        notes = [
+            self._create_note(self.user1, code_of_project=f"CUR-{i}") for i in range(25)
+        ]
+        expected = [note.pk for note in reversed(notes)]
+
+        seen = []
+        response = self.client.get("/api/notes/", {"pagination": "cursor"})
+        self.assertIsNone(response.data["previous"])
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            seen.extend(row["id"] for row in response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(seen, expected)
+
+        response = self.client.get(response.data["previous"])
+        self.assertEqual([row["id"] for row in response.data["results"]], expected[10:20])
+
+        response = self.client.get("/api/notes/", {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get("/notes/", {"pagination": "cursor"})
+        self.assertEqual(
+            [note.pk for note in response.context["experiment_notes"]], expected[:10]
+        )
+        self.assertIn("cursor=", response.context["load_more_query"])
+
+    def assertUsesIndex(self, queryset):
+        """Проверка по EXPLAIN, что запрос читает записи через индекс"""
+        plan = queryset.explain()
+        if connection.vendor == "postgresql":
+            self.assertIn("Index", plan)
+            self.assertNotIn("Seq Scan on labbook_experimentnote", plan)
+        else:
+            self.assertIn("USING", plan)
+            self.assertNotIn("SCAN labbook_experimentnote", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_main_queries_use_indexes(self):
+        """Тест на использование индексов основными запросами списка, поиска и статистики"""
+        ExperimentNote.objects.bulk_create(
+            ExperimentNote(owner=owner, code_of_project=f"IDX-{owner.pk}-{i}", title=f"Запись {i}")
+            for owner in (self.user1, self.user2)
+            for i in range(500)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        user_notes = ExperimentNote.objects.filter(owner=self.user1)
+        self.assertUsesIndex(user_notes)
+        self.assertUsesIndex(search_notes(user_notes.order_by("updated_at"), "Запись 1"))
+        self.assertUsesIndex(
+            ExperimentNote.objects.filter(
+                updated_at__gte=timezone.now() - timedelta(days=1)
+            ).values("pk")
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "триграммные индексы есть только в PostgreSQL")
+    def test_search_by_code_fragment_uses_trigram_index(self):
+        """Тест на поиск фрагмента кода проекта через триграммный индекс"""
+        ExperimentNote.objects.bulk_create(
+            ExperimentNote(owner=self.user1, code_of_project=f"TRG-{i}", title=f"Запись {i}")
+            for i in range(500)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+        plan = search_notes(ExperimentNote.objects.all(), "trg-42").explain()
+        self.assertIn("note_code_trgm_gin", plan)
+        self.assertNotIn("Seq Scan on labbook_experimentnote", plan)
+
+    def test_counts_from_owner_counter_and_capped_count(self):
+        """Тест на счётчик записей владельца и ограниченный подсчёт при фильтрах"""
+        notes = [self._create_note(self.user1, code_of_project=f"CNT-{i}") for i in range(5)]
+        notes[0].delete()
+        self.assertEqual(NoteCounter.objects.get(owner=self.user1).notes_count, 4)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/notes/")
+        self.assertEqual(response.data["count"], 4)
+        self.assertTrue(response.data["count_is_exact"])
+        self.assertFalse(
+            [q for q in queries.captured_queries if '"__count"' in q["sql"]]
+        )
+
+        with self.settings(NOTES_COUNT_CAP=3):
+            response = self.client.get("/api/notes/", {"status": "draft"})
+            self.assertEqual(response.data["count"], 3)
+            self.assertFalse(response.data["count_is_exact"])
+
+            response = self.client.get("/notes/search/", {"search_query": "CNT"})
+            self.assertEqual(response.context["page_obj"].paginator.count_display, "3+")
+            response = self.client.get("/notes/search/", {"search_query": "CNT", "page": 50})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context["page_obj"].number, 1)
+
+        with self.settings(NOTES_COUNT_CAP=1):
+            paginator = ApproximateCountPaginator(
+                ExperimentNote.objects.filter(owner=self.user1, status="draft").order_by("pk"), 1
+            )
+            self.assertEqual(paginator.num_pages, 1)
+            page = paginator.page(3)
+            self.assertFalse(paginator.count_is_exact)
+            self.assertEqual(list(page.object_list), [notes[3]])
+            self.assertTrue(page.has_next())
+            self.assertFalse(paginator.page(4).has_next())
+            with self.assertRaises(EmptyPage):
+                paginator.page(5)
+
+    def test_sparse_fieldsets_limit_payload_and_columns(self):
+        """Тест на облегчённый список и выбор полей ответа через ?fields= / ?omit="""
+        note = self._create_note(self.user1, code_of_project="SPR-1")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/notes/", {"pagination": "cursor"})
+        row = response.data["results"][0]
+        self.assertNotIn("comments", row)
+        self.assertNotIn("picture", row)
+        self.assertEqual(row["code_of_project"], "SPR-1")
+        page_query = [q["sql"] for q in queries.captured_queries if "LIMIT 11" in q["sql"]]
+        self.assertNotIn('"comments"', page_query[0])
+
+        response = self.client.get("/api/notes/", {"fields": "id,comments"})
+        self.assertEqual(
+            response.data["results"][0], {"id": note.pk, "comments": "Комментарий"}
+        )
+
+        response = self.client.get(f"/api/notes/{note.pk}/", {"omit": "comments,picture"})
+        self.assertNotIn("comments", response.data)
+        self.assertIn("optical_density", response.data)
+
+    def test_note_cache_is_per_owner_and_invalidated_on_change(self):
+        """Тест на чтение списка и записи через кэш владельца и его инвалидацию"""
+        note = self._create_note(self.user1, code_of_project="CACHE-1")
+        self.client.get("/notes/")
+        self.client.get(f"/api/notes/{note.pk}/")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/notes/")
+            self.client.get(f"/notes/{note.pk}/")
+            api_response = self.client.get(f"/api/notes/{note.pk}/")
+        self.assertEqual(response.context["experiment_notes"][0].code_of_project, "CACHE-1")
+        self.assertEqual(api_response.data["code_of_project"], "CACHE-1")
+        self.assertFalse(
+            [q for q in queries.captured_queries if 'FROM "labbook_experimentnote"' in q["sql"]]
+        )
+
+        note.title = "Изменено"
+        note.save()
+        response = self.client.get("/notes/")
+        self.assertEqual(response.context["experiment_notes"][0].title, "Изменено")
+        self.assertEqual(self.client.get(f"/api/notes/{note.pk}/").data["title"], "Изменено")
+
+        self.client.force_login(self.user2)
+        self.assertEqual(self.client.get(f"/api/notes/{note.pk}/").status_code, 404)
+        self.assertEqual(self.client.get(f"/notes/{note.pk}/").status_code, 403)
+        self.assertEqual(self.client.get("/api/notes/abc/").status_code, 404)
+
+        # Запросы чужой записи не подменяют её в кэше владельца
+        for title in ("Изменено владельцем", "Изменено ещё раз"):
+            note.title = title
+            note.save()
+            self.assertEqual(self.client.get(f"/api/notes/{note.pk}/").status_code, 404)
+        self.client.force_login(self.user1)
+        self.assertEqual(self.client.get(f"/api/notes/{note.pk}/").data["title"], "Изменено ещё раз")
+        self.assertContains(self.client.get(f"/notes/{note.pk}/"), "Изменено ещё раз")
+
+    def test_daily_activity_counters(self):
+        """Тест на дневные счётчики активности: создание, перенос между днями, удаление"""
+        note = self._create_note(self.user1, code_of_project="DAY-1")
+        self._create_note(self.user2, code_of_project="DAY-2")
+        response = self.client.get("/api/notes/home-stats/")
+        self.assertEqual(response.data, {"count_entries": 2, "count_own_entries": 1})
+
+        yesterday_at = timezone.now() - timedelta(days=1)
+        yesterday = timezone.localdate(yesterday_at)
+        ExperimentNote.objects.filter(pk=note.pk).update(updated_at=yesterday_at)
+        call_command("rebuild_note_counters", stdout=StringIO())
+        self.assertEqual(get_daily_activity(self.user1), 0)
+        self.assertEqual(get_daily_activity(self.user1, yesterday), 1)
+
+        note = ExperimentNote.objects.get(pk=note.pk)
+        note.title = "Изменено сегодня"
+        note.save()
+        self.assertEqual(get_daily_activity(self.user1), 1)
+        self.assertEqual(get_daily_activity(self.user1, yesterday), 0)
+
+        note.delete()
+        self.assertEqual(get_daily_activity(self.user1), 0)
+        self.assertEqual(get_daily_activity(), 1)
+
+    def test_conditional_get_returns_not_modified(self):
+        """Тест на ETag/Last-Modified и 304 Not Modified без обращения к записям"""
+        note = self._create_note(self.user1, code_of_project="ETAG-1")
+        self.client.get("/notes/")  # HTML-страницы выдают CSRF-cookie, она входит в ETag
+        for url in ("/api/notes/", f"/api/notes/{note.pk}/", "/notes/", f"/notes/{note.pk}/"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etag = response["ETag"]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], etag)
+            self.assertFalse(
+                [q for q in queries.captured_queries if "labbook_" in q["sql"]]
+            )
+
+        response = self.client.get(f"/api/notes/{note.pk}/")
+        last_modified = response["Last-Modified"]
+        response = self.client.get(
+            f"/api/notes/{note.pk}/", HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 304)
+
+        list_etag = self.client.get("/api/notes/")["ETag"]
+        self.client.patch(f"/api/notes/{note.pk}/", {"title": "Новое"}, format="json")
+        response = self.client.get("/api/notes/", HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f"/api/notes/{note.pk}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["title"], "Новое")
+
+    def test_note_rows_fragment_cache(self):
+        """Тест на кэш строк таблицы: неизменившиеся строки не отрисовываются заново"""
+        note = self._create_note(self.user1, code_of_project="ROW-1")
+        self._create_note(self.user1, code_of_project="ROW-2")
+        response = self.client.get("/notes/")
+        self.assertTemplateUsed(response, "note_row.html", count=2)
+        self.assertContains(response, "ROW-1")
+
+        response = self.client.get("/notes/")
+        self.assertTemplateNotUsed(response, "note_row.html")
+        self.assertContains(response, "ROW-2")
+
+        note.title = "Новое название"
+        note.save()
+        response = self.client.get("/notes/")
+        self.assertTemplateUsed(response, "note_row.html", count=1)
+        self.assertContains(response, "Новое название")
+
+    def test_get_or_compute_single_flight(self):
+        """Тест на однократный пересчёт ключа при одновременных промахах и раннем обновлении"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "value"
+
+        threads = [
+            threading.Thread(target=get_or_compute, args=("stampede", compute, 60))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(get_or_compute("stampede", compute, 60), "value")
+        self.assertEqual(len(calls), 1)
+
+        # Срок истёк, но пересчёт уже выполняет другой процесс — отдаётся прежнее значение
+        cache.set("stampede", ("old", 0.1, time.time() - 1), 60)
+        cache.add("stampede:lock", 1)
+        self.assertEqual(get_or_compute("stampede", compute, 60), "old")
+        cache.delete("stampede:lock")
+        self.assertEqual(get_or_compute("stampede", compute, 60), "value")
+        self.assertEqual(len(calls), 2)
+
+    def test_local_cache_for_employee_and_notes(self):
+        """Тест на кэш процесса: сотрудник и запись читаются без запросов к базе"""
+        note = self._create_note(self.user1, code_of_project="L1-1")
+        self.client.get(f"/notes/{note.pk}/")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/notes/{note.pk}/")
+        self.assertContains(response, "L1-1")
+        tables = " ".join(q["sql"] for q in queries.captured_queries)
+        self.assertNotIn("users_employee", tables)
+        self.assertNotIn("labbook_experimentnote", tables)
+
+        self.user1.first_name = "Анна"
+        self.user1.save()
+        note.title = "Обновлено"
+        note.save()
+        response = self.client.get(f"/notes/{note.pk}/")
+        self.assertContains(response, "Анна")
+        self.assertContains(response, "Обновлено")
+
+        stats = get_local_cache().stats()
+        self.assertGreater(stats["hits"], 0)
+        self.assertGreater(stats["misses"], 0)
+        self.assertEqual(self.client.get("/api/notes/cache-stats/").status_code, 403)
+
+    def test_bulk_create_reports_item_errors(self):
+        """Тест на массовое создание: конфликты кодов одним запросом и ошибки по индексам"""
+        self._create_note(self.user1, code_of_project="BULK-TAKEN")
+        payload = self.valid_payload
+        items = [
+            {**payload, "code_of_project": "BULK-1"},
+            {**payload, "code_of_project": "BULK-TAKEN"},
+            {**payload, "code_of_project": "BULK-2", "signal_level": "5.00"},
+            {**payload, "code_of_project": "BULK-1"},
+            {**payload, "code_of_project": "BULK-3"},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/notes/bulk/", items, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item["index"] for item in response.data["created"]], [0, 4])
+        self.assertEqual([item["index"] for item in response.data["errors"]], [1, 2, 3])
+        self.assertIn("signal_level", response.data["errors"][1]["errors"])
+        lookups = [
+            q for q in queries.captured_queries
+            if q["sql"].startswith("SELECT") and "code_of_project" in q["sql"]
+        ]
+        self.assertEqual(len(lookups), 1)
+
+        self.assertEqual(NoteCounter.objects.get(owner=self.user1).notes_count, 3)
+        self.assertEqual(get_daily_activity(self.user1), 3)
+        response = self.client.get("/api/notes/")
+        self.assertEqual(response.data["count"], 3)
+        self.assertTrue(
+            ExperimentNote.objects.filter(code_of_project="BULK-3", owner=self.user1).exists()
+        )
+
+    def test_bulk_update_only_owned_notes(self):
+        """Тест на массовое изменение: только свои записи, одним UPDATE, с обновлением кэша"""
+        own = [self._create_note(self.user1, code_of_project=f"UPD-{i}") for i in range(3)]
+        own[2].status = "review"
+        own[2].save()
+        other = self._create_note(self.user2, code_of_project="UPD-OTHER")
+        ids = [note.pk for note in own] + [other.pk]
+        etag = self.client.get(f"/api/notes/{own[0].pk}/")["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                "/api/notes/bulk/",
+                {
+                    "ids": ids,
+                    "changes": {"status": "in_progress"},
+                    "increment": {"version_of_protocol": 1},
+                    "from_status": "draft",
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 2)
+        updates = [
+            q for q in queries.captured_queries
+            if q["sql"].startswith('UPDATE "labbook_experimentnote"')
+        ]
+        self.assertEqual(len(updates), 1)
+
+        own[0].refresh_from_db()
+        self.assertEqual((own[0].status, own[0].version_of_protocol), ("in_progress", 2))
+        other.refresh_from_db()
+        self.assertEqual(other.status, "draft")
+        response = self.client.get(f"/api/notes/{own[0].pk}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data["status"], "in_progress")
+
+        response = self.client.patch(
+            "/api/notes/bulk/", {"ids": ids, "changes": {"code_of_project": "X"}}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+        own[0].latex_started_at = timezone.now()
+        own[0].save()
+        earlier = (own[0].latex_started_at - timedelta(hours=1)).isoformat()
+        for changes in (
+            {"latex_completed_at": earlier},
+            {"latex_started_at": own[0].latex_started_at.isoformat(), "latex_completed_at": earlier},
+        ):
+            response = self.client.patch("/api/notes/bulk/", {"ids": ids, "changes": changes}, format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("latex_completed_at", response.data["changes"])
+        later = (own[1].latex_started_at + timedelta(hours=1)).isoformat()
+        response = self.client.patch(
+            "/api/notes/bulk/", {"ids": [own[1].pk], "changes": {"latex_completed_at": later}}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_export_csv_streams_filtered_notes(self):
+        """Тест на потоковую выгрузку CSV с фильтрами и поиском"""
+        self._create_note(self.user1, code_of_project="EXP-1", title="Латекс")
+        self._create_note(self.user1, code_of_project="EXP-2", title="Буфер", status="review")
+        self._create_note(self.user2, code_of_project="EXP-3", title="Латекс")
+
+        response = self.client.get("/notes/export/", {"search_query": "Латекс"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.reader(b"".join(response.streaming_content).decode("utf-8-sig").splitlines()))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][:2], ["EXP-1", "Латекс"])
+
+        response = self.client.get("/api/notes/export/", {"status": "review"})
+        content = b"".join(response.streaming_content).decode("utf-8-sig")
+        self.assertIn("EXP-2", content)
+        self.assertNotIn("EXP-1", content)
+
+        response = self.client.get("/api/notes/export/", HTTP_ACCEPT="text/csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+
+    def test_import_notes_command(self):
+        """Тест на импорт CSV: проверка ограничений пакетом и обновление счётчиков"""
+        self._create_note(self.user1, code_of_project="IMP-TAKEN")
+        started = timezone.now().replace(microsecond=0)
+        lines = [
+            "code_of_project,title,status,optical_density,latex_started_at,latex_completed_at",
+            f"IMP-1,Первая,draft,5.00,{started.isoformat()},{(started + timedelta(hours=1)).isoformat()}",
+            "IMP-2,Вторая,review,11.00,,",
+            f"IMP-3,Третья,draft,1.00,{started.isoformat()},{(started - timedelta(hours=1)).isoformat()}",
+            "IMP-TAKEN,Занятый код,draft,1.00,,",
+            "IMP-1,Повтор,draft,1.00,,",
+            "IMP-4,Четвёртая,,,,",
+        ]
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", delete=False, encoding="utf-8"
+        ) as file:
+            file.write("\n".join(lines))
+        out, err = StringIO(), StringIO()
+        call_command(
+            "import_notes",
+            file.name,
+            owner="owner@example.com",
+            batch_size=4,
+            stdout=out,
+            stderr=err,
+        )
+        os.unlink(file.name)
+
+        self.assertIn("Загружено строк: 2, пропущено: 4", out.getvalue())
+        self.assertIn("строк/с", out.getvalue())
+        self.assertIn("Строка 3: optical_density", err.getvalue())
+        self.assertIn("Строка 4: latex_completed_at", err.getvalue())
+        self.assertEqual(
+            set(
+                ExperimentNote.objects.filter(
+                    code_of_project__startswith="IMP-", owner=self.user1
+                ).values_list("code_of_project", flat=True)
+            ),
+            {"IMP-TAKEN", "IMP-1", "IMP-4"},
+        )
+        self.assertEqual(NoteCounter.objects.get(owner=self.user1).notes_count, 3)
+        self.assertEqual(
+            ExperimentNote.objects.get(code_of_project="IMP-4").status, "draft"
+        )
+
+    def test_list_streams_ndjson(self):
+        """Тест на потоковую выдачу списка в формате NDJSON"""
+        for i in range(15):
+            self._create_note(self.user1, code_of_project=f"ND-{i}", status="review" if i % 3 else "draft")
+        self._create_note(self.user2, code_of_project="ND-OTHER")
+
+        response = self.client.get(
+            "/api/notes/", {"status": "review", "fields": "id,code_of_project"}, HTTP_ACCEPT="application/x-ndjson"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(set(json.loads(lines[0])), {"id", "code_of_project"})
+
+        response = self.client.get("/api/notes/", {"format": "ndjson"})
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 15)
+
+        response = self.client.get(
+            "/api/notes/search/", {"search_query": "ND-1", "status": "review"}, HTTP_ACCEPT="application/x-ndjson"
+        )
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            sorted(json.loads(line)["code_of_project"] for line in lines), ["ND-1", "ND-10", "ND-11", "ND-13", "ND-14"]
+        )
+
+    def test_pdf_reports_are_rendered_once_per_version(self):
+        """Тест на PDF-отчёты: кэширование по версии записи и отчёт по проекту"""
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            os.makedirs(os.path.join(media_root, "labbook", "images"))
+            Image.new("RGB", (64, 48), "blue").save(os.path.join(media_root, "labbook", "images", "gel.png"))
+            note = self._create_note(self.user1, code_of_project="REP-1", picture="labbook/images/gel.png")
+            self._create_note(self.user1, code_of_project="REP-2", comments="Длинный комментарий " * 200)
+            reports_dir = os.path.join(media_root, "reports")
+
+            response = self.client.get(f"/api/notes/{note.pk}/report/")
+            self.assertEqual(response.data["status"], "ready")
+            self.assertTrue(response.data["url"].endswith(f"/api/notes/{note.pk}/report/pdf/"))
+            response = self.client.get(f"/api/notes/{note.pk}/report/pdf/", HTTP_ACCEPT="application/pdf")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "application/pdf")
+            self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+            first = os.listdir(reports_dir)
+            self.client.get(f"/api/notes/{note.pk}/report/")
+            self.assertEqual(os.listdir(reports_dir), first)
+
+            note.title = "Новое название"
+            note.save()
+            self.assertEqual(self.client.get(f"/api/notes/{note.pk}/report/pdf/").status_code, 404)
+            self.assertEqual(self.client.get(f"/api/notes/{note.pk}/report/").data["status"], "ready")
+            self.assertEqual(len(os.listdir(reports_dir)), 1)
+            self.assertNotEqual(os.listdir(reports_dir), first)
+
+            response = self.client.get("/api/notes/project-report/", {"code": "REP-"})
+            self.assertEqual(response.data["status"], "ready")
+            response = self.client.get(
+                "/api/notes/project-report/pdf/", {"code": "REP-"}, HTTP_ACCEPT="application/pdf"
+            )
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get("/api/notes/project-report/pdf/", HTTP_ACCEPT="application/pdf")
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response["Content-Type"], "application/json")
+            self.assertEqual(self.client.get("/api/notes/project-report/").status_code, 400)
+            self.assertEqual(self.client.get("/api/notes/project-report/", {"code": "NONE"}).status_code, 404)
+
+    def test_thumbnails_generated_for_pictures_and_avatars(self):
+        """Тест на уменьшенные копии изображений: создание при сохранении, srcset и команда досоздания"""
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            os.makedirs(os.path.join(media_root, "labbook", "images"))
+            os.makedirs(os.path.join(media_root, "users", "photos"))
+            Image.new("RGBA", (2000, 1000), (0, 128, 0, 128)).save(
+                os.path.join(media_root, "labbook", "images", "gel.png")
+            )
+            Image.new("RGB", (300, 600), "white").save(os.path.join(media_root, "users", "photos", "me.jpg"))
+            thumb = os.path.join(media_root, "thumbs", "labbook", "images", "gel.png_160w.jpg")
+            preview = os.path.join(media_root, "thumbs", "labbook", "images", "gel.png_640w.jpg")
+            avatar = os.path.join(media_root, "thumbs", "users", "photos", "me.jpg_160w.jpg")
+
+            with self.captureOnCommitCallbacks(execute=True):
+                note = self._create_note(self.user1, code_of_project="IMG-1", picture="labbook/images/gel.png")
+                self.user1.avatar = "users/photos/me.jpg"
+                self.user1.save()
+            with Image.open(thumb) as image:
+                self.assertEqual(image.size, (160, 80))
+            with Image.open(preview) as image:
+                self.assertEqual(image.size, (640, 320))
+            self.assertTrue(os.path.exists(avatar))
+
+            response = self.client.get(f"/api/notes/{note.pk}/")
+            self.assertTrue(response.data["picture_preview"].endswith("/media/thumbs/labbook/images/gel.png_640w.jpg"))
+            row = self.client.get("/api/notes/").data["results"][0]
+            self.assertTrue(row["picture_thumbnail"].endswith("gel.png_160w.jpg"))
+            page = self.client.get("/notes/")
+            self.assertContains(
+                page, '<source type="image/webp" srcset="/media/thumbs/labbook/images/gel.png_160w.webp 160w, '
+            )
+            self.assertContains(page, 'src="/media/thumbs/labbook/images/gel.png_160w.jpg"')
+            images = os.path.join(media_root, "thumbs", "labbook", "images")
+            with Image.open(os.path.join(images, "gel.png_1280w.webp")) as image:
+                self.assertEqual((image.format, image.size), ("WEBP", (1280, 640)))
+
+            # Копии шире оригинала не создаются и не попадают в srcset
+            photos = os.path.join(media_root, "thumbs", "users", "photos")
+            self.assertEqual((note.picture_width, self.user1.avatar_width), (2000, 300))
+            with Image.open(os.path.join(photos, "me.jpg_320w.jpg")) as image:
+                self.assertEqual(image.size, (300, 600))
+            self.assertFalse(os.path.exists(os.path.join(photos, "me.jpg_640w.jpg")))
+            self.assertIn(
+                ("image/webp", "/media/thumbs/users/photos/me.jpg_160w.webp 160w, "
+                 "/media/thumbs/users/photos/me.jpg_320w.webp 300w"),
+                image_sources(self.user1.avatar),
+            )
+            self.assertTrue(thumbnail_url(self.user1.avatar, "preview").endswith("me.jpg_320w.jpg"))
+
+            os.remove(thumb)
+            ExperimentNote.objects.filter(pk=note.pk).update(picture_width=None)
+            cache.clear()
+            self.assertTemplateUsed(self.client.get("/notes/"), "note_row.html", count=1)
+            out = StringIO()
+            call_command("generate_thumbnails", workers=1, stdout=out)
+            self.assertTemplateUsed(self.client.get("/notes/"), "note_row.html", count=1)
+            self.assertIn("Миниатюры созданы: 1, ошибок: 0, уже были: 1", out.getvalue())
+            self.assertTrue(os.path.exists(thumb))
+            note.refresh_from_db()
+            self.assertEqual(note.picture_width, 2000)
+
+    def test_content_addressed_pictures_are_deduplicated_and_collected(self):
+        """Тест на хранилище изображений по содержимому: дедупликация, счётчик ссылок и сборка мусора"""
+        def upload(color):
+            buffer = BytesIO()
+            Image.new("RGB", (8, 8), color).save(buffer, "PNG")
+            return SimpleUploadedFile("photo.png", buffer.getvalue(), content_type="image/png")
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            first = self._create_note(self.user1, code_of_project="BLOB-1", picture=upload("red"))
+            second = self._create_note(self.user1, code_of_project="BLOB-2", picture=upload("red"))
+            self.assertEqual(first.picture.name, second.picture.name)
+            self.assertRegex(first.picture.name, r"^blobs/[0-9a-f]{2}/[0-9a-f]{64}\.png$")
+            red = first.picture.name
+            self.assertEqual(MediaBlob.objects.get(name=red).refcount, 2)
+
+            first.delete()
+            self.assertEqual(MediaBlob.objects.get(name=red).refcount, 1)
+            second = ExperimentNote.objects.get(pk=second.pk)
+            second.picture = upload("green")
+            second.save()
+            self.assertEqual(MediaBlob.objects.get(name=red).refcount, 0)
+            self.assertEqual(MediaBlob.objects.get(name=second.picture.name).refcount, 1)
+
+            out = StringIO()
+            call_command("gc_media_blobs", grace=0, stdout=out)
+            self.assertIn("Удалено файлов: 1", out.getvalue())
+            self.assertFalse(os.path.exists(os.path.join(media_root, red)))
+            self.assertFalse(MediaBlob.objects.filter(name=red).exists())
+            self.assertTrue(os.path.exists(second.picture.path))
+
+            # Повторная загрузка файла без ссылок защищает его от сборки мусора
+            green = second.picture.name
+            second.picture = upload("blue")
+            second.save()
+            hour_ago = timezone.now() - timedelta(hours=1)
+            MediaBlob.objects.filter(name=green).update(updated_at=hour_ago)
+            os.utime(os.path.join(media_root, green), (hour_ago.timestamp(), hour_ago.timestamp()))
+            self.assertEqual(blob_storage.save("again.png", upload("green")), green)
+            call_command("gc_media_blobs", grace=600, stdout=StringIO())
+            self.assertTrue(os.path.exists(os.path.join(media_root, green)))
+            self.assertGreater(MediaBlob.objects.get(name=green).updated_at, hour_ago)
+
+    @override_settings(PROTECTED_MEDIA={"X_ACCEL_REDIRECT": True, "INTERNAL_LOCATION": "/protected-media/"})
+    def test_protected_media_is_served_to_owner_via_x_accel_redirect(self):
+        """Тест на выдачу изображений только владельцу через X-Accel-Redirect"""
+        name = "blobs/ab/" + "ab" * 32 + ".png"
+        note = self._create_note(self.user1, code_of_project="MEDIA-1")
+        ExperimentNote.objects.filter(pk=note.pk).update(picture=name)
+        Employee.objects.filter(pk=self.user2.pk).update(avatar="users/photos/other.jpg")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/media/{name}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{name}")
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response.content, b"")
+        self.assertEqual(
+            len([q for q in queries.captured_queries if 'FROM "labbook_experimentnote"' in q["sql"]]), 1
+        )
+
+        thumb = "thumbs/blobs/ab/" + "ab" * 32 + ".png_160w.webp"
+        self.assertEqual(self.client.get(f"/media/{thumb}")["X-Accel-Redirect"], f"/protected-media/{thumb}")
+        self.assertEqual(self.client.get("/media/users/photos/other.jpg").status_code, 404)
+        self.assertNotContains(self.client.get(reverse("users:users")), "other.jpg")
+
+        self.client.force_login(self.user2)
+        self.assertEqual(self.client.get(f"/media/{name}").status_code, 404)
+        response = self.client.get("/media/users/photos/other.jpg")
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+
+        self.user2.refresh_from_db()
+        self.user2.is_superuser = True
+        self.user2.save()
+        self.assertEqual(self.client.get(f"/media/{name}").status_code, 200)
+        self.assertEqual(self.client.get("/media/blobs/../../settings.py").status_code, 404)
+        self.assertEqual(self.client.get("/media//etc/passwd").status_code, 404)
+        self.assertContains(self.client.get(reverse("users:users")), "other.jpg")
+
+        self.client.logout()
+        self.assertEqual(self.client.get(f"/media/{name}").status_code, 302)
@@ -0,0 +1,178 @@
+import os
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .images import make_thumbnails, oriented_width, supported_formats
+from .tasks import get_executor
+
+# MIME-типы форматов для `<source type>`
+MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def get_formats():
+    """Форматы копий из `THUMBNAILS["FORMATS"]`, доступные в Pillow; JPEG — последний,
+    для браузеров без AVIF/WebP."""
+    return supported_formats(settings.THUMBNAILS["FORMATS"])
+
+
+def image_name(name, width, image_format):
+    """Имя уменьшенной копии: `thumbs/<путь изображения>_<ширина>w.<формат>`.
+
+    Расширение изображения остаётся в имени, чтобы у `gel.png` и `gel.jpg`
+    были разные копии.
+    """
+    extension = "jpg" if image_format == "jpeg" else image_format
+    return "%s/%s_%sw.%s" % (settings.THUMBNAILS["DIR"], name, width, extension)
+
+
+def source_name(name):
+    """Имя изображения, если `name` — его уменьшенная копия, иначе None."""
+    match = re.fullmatch(
+        r"%s/(?P<name>.+)_\d+w\.[a-z]+" % re.escape(settings.THUMBNAILS["DIR"]), name
+    )
+    return match and match["name"]
+
+
+def image_width(file):
+    """Ширина изображения поля модели или None, если файл не читается."""
+    try:
+        if getattr(file, "_committed", True):
+            return oriented_width(file.path)
+        file.file.seek(0)
+        return oriented_width(file.file)
+    except (OSError, ValueError, NotImplementedError):
+        return None
+
+
+def source_width(file):
+    """Ширина изображения, записанная в модели (поле `<поле изображения>_width`)."""
+    instance = getattr(file, "instance", None)
+    if instance is None:
+        return None
+    return getattr(instance, "%s_width" % file.field.name, None)
+
+
+def record_image_width(instance, field_name):
+    """Запись ширины изображения в `<поле>_width` перед сохранением объекта,
+    если изображение новое или его ширина ещё неизвестна."""
+    width_field = "%s_width" % field_name
+    if {field_name, width_field} & instance.get_deferred_fields():
+        return
+    file = getattr(instance, field_name)
+    if not file:
+        setattr(instance, width_field, None)
+        return
+    loaded = getattr(instance, "_loaded_%s" % field_name, None)
+    if getattr(loaded, "name", loaded) != file.name or getattr(instance, width_field) is None:
+        setattr(instance, width_field, image_width(file))
+
+
+def image_widths(width=None):
+    """Копии изображения шириной `width`: список (ширина в имени файла, ширина копии).
+
+    Изображения не увеличиваются, поэтому копии шире оригинала не создаются:
+    вместо них одна копия в размер оригинала под именем ближайшей большей
+    ширины из `WIDTHS`. Если ширина неизвестна, создаются все копии.
+    """
+    widths = settings.THUMBNAILS["WIDTHS"]
+    if not width:
+        return [(size, size) for size in widths]
+    result = [(size, size) for size in widths if size < width]
+    larger = [size for size in widths if size >= width]
+    if larger:
+        result.append((larger[0], width))
+    return result
+
+
+def thumbnail_name(name, variant, width=None):
+    """Имя JPEG-копии именованного размера (`thumb`, `preview`) изображения шириной `width`."""
+    size = settings.THUMBNAILS["SIZES"][variant]
+    sizes = [name_width for name_width, _ in image_widths(width)]
+    size = max((name_width for name_width in sizes if name_width <= size), default=sizes[0])
+    return image_name(name, size, "jpeg")
+
+
+def thumbnail_url(file, variant):
+    """Адрес миниатюры изображения (файл модели или его имя).
+
+    Адрес вычисляется по имени и записанной ширине изображения без обращения
+    к хранилищу, поэтому его можно кэшировать вместе с отрисованными строками таблиц.
+    """
+    name = getattr(file, "name", file)
+    if not name:
+        return None
+    return default_storage.url(thumbnail_name(name, variant, source_width(file)))
+
+
+def image_sources(file):
+    """Варианты изображения для `<picture>`: список (MIME-тип, srcset) по форматам.
+
+    В srcset попадают только созданные копии с их настоящей шириной.
+    """
+    name = getattr(file, "name", file)
+    if not name:
+        return []
+    widths = image_widths(source_width(file))
+    return [
+        (
+            MEDIA_TYPES[image_format],
+            ", ".join(
+                "%s %sw"
+                % (default_storage.url(image_name(name, size, image_format)), width)
+                for size, width in widths
+            ),
+        )
+        for image_format in get_formats()
+    ]
+
+
+def thumbnail_targets(name, width=None, force=False):
+    """Пути, ширины, форматы и качество копий изображения шириной `width`;
+    пустой список, если все копии уже созданы."""
+    options = settings.THUMBNAILS
+    targets = [
+        (
+            default_storage.path(image_name(name, size, image_format)),
+            size,
+            image_format,
+            options["QUALITY"][image_format],
+        )
+        for size, _ in image_widths(width)
+        for image_format in get_formats()
+    ]
+    if not force and all(os.path.exists(target[0]) for target in targets):
+        return []
+    return targets
+
+
+def delete_thumbnails(name):
+    """Удаление всех уменьшенных копий изображения."""
+    for width in settings.THUMBNAILS["WIDTHS"]:
+        for image_format in settings.THUMBNAILS["FORMATS"]:
+            default_storage.delete(image_name(name, width, image_format))
+
+
+def generate_thumbnails(name, width=None):
+    """Создание недостающих копий изображения в фоновом пуле процессов.
+
+    Одно изображение обрабатывает только один процесс (`cache.add`).
+    Возвращает future задачи или None, если делать ничего не нужно.
+    """
+    targets = thumbnail_targets(name, width)
+    key = "thumbnails:%s" % name
+    if not targets or not cache.add(key, 1, settings.CACHE_LOCK_TIMEOUT):
+        return None
+    future = get_executor().submit(make_thumbnails, default_storage.path(name), targets)
+    future.add_done_callback(lambda future: cache.delete(key))
+    return future
+
+
+def schedule_thumbnails(file):
+    """Создание копий после фиксации транзакции, в которой сохранён файл."""
+    if file:
+        name, width = file.name, source_width(file)
+        transaction.on_commit(lambda: generate_thumbnails(name, width))
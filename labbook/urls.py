@@ -11,6 +11,8 @@ from .views import (
     ExperimentNoteUpdateView,
     ExperimentNoteDeleteView,
     SearchEntries,
+    ExportNotesView,
+    ProtectedMediaView,
 )
 
 app_name = "labbook"
@@ -37,6 +39,8 @@ urlpatterns = [
         name="deleting_experiment_note",
     ),
     path("notes/search/", SearchEntries.as_view(), name="search_entries"),
+    path("notes/export/", ExportNotesView.as_view(), name="export_notes"),
+    path("media/<path:name>", ProtectedMediaView.as_view(), name="protected_media"),
     # API
     path("", include(router.urls)),
 ]
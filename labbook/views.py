@@ -1,28 +1,97 @@
-import datetime
+import mimetypes
+
 from django.core.exceptions import PermissionDenied
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.db.models import Q
+from django.conf import settings
+from django.core.paginator import EmptyPage, PageNotAnInteger
+from django.http import Http404, HttpResponse
 from django.shortcuts import render, redirect
 from django.urls import reverse, reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.utils import timezone
 from django.views.generic import ListView, DetailView, View
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
+from django.views.static import serve
+from .blobs import is_blob
+from .conditional import conditional_response, list_etag, note_etag
+from .export import csv_response, get_export_queryset
+from .filters import filter_notes, get_facet_links, get_owner_facet_counts
 from .forms import ExperimentNoteForm, DateForm
 from .models import ExperimentNote
+from .pagination import (
+    ApproximateCountPaginator,
+    InvalidCursor,
+    is_cursor_mode,
+    keyset_page,
+)
+from .search import search_notes
+from .services import get_cached_note, get_home_stats, request_cache_key
+from .thumbnails import source_name
 
 
 class ExperimentNoteListView(LoginRequiredMixin, ListView):
     """Класс-Generic для эндпоинта списка записей об экспериментах в рабочем журнале."""
 
     paginate_by = 10
+    paginator_class = ApproximateCountPaginator
     model = ExperimentNote
     template_name = "experiment_notes.html"
     context_object_name = "experiment_notes"
 
     def get_queryset(self):
         """Метод для изменения запроса к базе данных по объектам модели "Запись об эксперименте в рабочем журнале"."""
-        return ExperimentNote.objects.filter(owner=self.request.user)
+        queryset, self.filter_conditions = filter_notes(
+            ExperimentNote.objects.filter(owner=self.request.user), self.request.GET
+        )
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        """Метод запроса GET: 304 Not Modified, если список у сотрудника не изменился."""
+        return conditional_response(
+            request,
+            list_etag(request, html=True),
+            lambda: super(ExperimentNoteListView, self).get(request, *args, **kwargs),
+        )
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        """Метод создаёт paginator; без фильтров количество берётся из счётчика владельца."""
+        return self.paginator_class(
+            queryset,
+            per_page,
+            orphans,
+            allow_empty_first_page,
+            owner=None if self.filter_conditions else self.request.user,
+            cache_owner=self.request.user,
+            cache_key=request_cache_key(self.request),
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        """Метод пагинации: режим «Загрузить ещё» (keyset) вместо номеров страниц."""
+        if not is_cursor_mode(self.request.GET):
+            return super().paginate_queryset(queryset, page_size)
+        try:
+            items, self.next_cursor, _ = keyset_page(
+                queryset, self.request.GET.get("cursor"), page_size
+            )
+        except InvalidCursor:
+            raise Http404("Некорректный курсор.")
+        return None, None, items, False
+
+    def get_context_data(self, **kwargs):
+        """Метод добавляет в контекст фасеты фильтров с количеством записей."""
+        context_data = super().get_context_data(**kwargs)
+        next_cursor = getattr(self, "next_cursor", None)
+        if next_cursor:
+            next_query = self.request.GET.copy()
+            next_query["cursor"] = next_cursor
+            context_data["load_more_query"] = next_query.urlencode()
+        counts = get_owner_facet_counts(
+            self.request.user, self.filter_conditions, request_cache_key(self.request)
+        )
+        context_data["facets"] = get_facet_links(counts, self.request.GET)
+        filter_query = self.request.GET.copy()
+        filter_query.pop("page", None)
+        context_data["filter_query"] = filter_query.urlencode()
+        return context_data
 
 
 class ExperimentNoteCreateView(LoginRequiredMixin, CreateView):
@@ -52,12 +121,28 @@ class ExperimentNoteDetailView(LoginRequiredMixin, DetailView):
     template_name = "experiment_note.html"
 
     def get_object(self, queryset=None):
-        """Метод проверки на доступ к объекту "Запись в рабочем журнале"."""
-        self.object = super().get_object(queryset)
-        if self.object.owner != self.request.user:
-            raise PermissionDenied
+        """Метод проверки на доступ к объекту "Запись в рабочем журнале" (чтение через кэш)."""
+        try:
+            pk = int(self.kwargs["pk"])
+        except (TypeError, ValueError):
+            raise Http404("Запись не найдена.")
+        self.object = get_cached_note(self.request.user.pk, pk)
+        if self.object is None:
+            if ExperimentNote.objects.filter(pk=pk).exists():
+                raise PermissionDenied
+            raise Http404("Запись не найдена.")
         return self.object
 
+    def get(self, request, *args, **kwargs):
+        """Метод запроса GET: 304 Not Modified, если запись не менялась."""
+        self.object = self.get_object()
+        return conditional_response(
+            request,
+            note_etag(request, self.object, html=True),
+            lambda: self.render_to_response(self.get_context_data(object=self.object)),
+            self.object.updated_at,
+        )
+
 
 class ExperimentNoteUpdateView(LoginRequiredMixin, UpdateView):
     """Класс представления вида Generic для эндпоинта изменения записи в рабочем журнале."""
@@ -97,6 +182,7 @@ class HomePageView(LoginRequiredMixin, ListView):
     """Класс Generic для эндпоинта главной страницы."""
 
     paginate_by = 14
+    paginator_class = ApproximateCountPaginator
     model = ExperimentNote
     template_name = "home.html"
     context_object_name = "experiment_notes"
@@ -104,15 +190,25 @@ class HomePageView(LoginRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         """Метод для изменения информации выводимой в представлении."""
         context_data = super().get_context_data(**kwargs)
-        context_data["count_entries"] = len(
-            ExperimentNote.objects.filter(updated_at=datetime.date.today())
-        )
+        context_data.update(get_home_stats(self.request.user))
         return context_data
 
     def get_queryset(self):
         """Метод для изменения запроса к базе данных по объектам модели "Запись в рабочем журнале"."""
         return ExperimentNote.objects.filter(owner=self.request.user)
 
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        """Метод создаёт paginator с количеством записей из счётчика владельца."""
+        return self.paginator_class(
+            queryset,
+            per_page,
+            orphans,
+            allow_empty_first_page,
+            owner=self.request.user,
+            cache_owner=self.request.user,
+            cache_key=request_cache_key(self.request),
+        )
+
 
 def choice_date(self, request):
     """Метод запроса POST для вывода отфильтрованной информации по записям по выбранной дате."""
@@ -139,46 +235,84 @@ class SearchEntries(LoginRequiredMixin, View):
         """Метод запроса GET для вывода отфильтрованной ключевому слову запроса информации по записям."""
         context = {}
         search_query = request.GET.get("search_query")
-        user_entries = ExperimentNote.objects.filter(owner=self.request.user)
-        if search_query is not None:
-            experiment_notes = user_entries.filter(
-                Q(title__icontains=search_query) | Q(code_of_project__icontains=search_query)
-            ).order_by("updated_at")
-
-            context["last_search_query"] = "?search_query=%s" % search_query
-            current_page = Paginator(experiment_notes, 10)
-
-            page = request.GET.get("page")
-            try:
-                context["experiment_notes"] = current_page.page(page)
-            except PageNotAnInteger:
-                context["experiment_notes"] = current_page.page(1)
-            except EmptyPage:
-                context["experiment_notes"] = current_page.page(current_page.num_pages)
-            return render(request, template_name=self.template_name, context=context)
-        elif search_query == "":
-            context["last_search_query"] = "?search_query=%s" % search_query
-            current_page = Paginator(user_entries, 10)
-
-            page = request.GET.get("page")
-            try:
-                context["experiment_notes"] = current_page.page(page)
-            except PageNotAnInteger:
-                context["experiment_notes"] = current_page.page(1)
-            except EmptyPage:
-                context["experiment_notes"] = current_page.page(current_page.num_pages)
-
-            return render(request, template_name=self.template_name, context=context)
+        user_entries, conditions = filter_notes(
+            ExperimentNote.objects.filter(owner=self.request.user), request.GET
+        )
+        experiment_notes = user_entries
+        if search_query:
+            experiment_notes = search_notes(
+                user_entries.order_by("updated_at"), search_query
+            )
+
+        context["last_search_query"] = "?search_query=%s" % search_query
+        current_page = ApproximateCountPaginator(
+            experiment_notes,
+            10,
+            owner=None if search_query or conditions else self.request.user,
+            cache_owner=self.request.user,
+            cache_key=request_cache_key(self.request),
+        )
+
+        page = request.GET.get("page")
+        try:
+            context["experiment_notes"] = current_page.page(page)
+        except (PageNotAnInteger, EmptyPage):
+            # При приблизительном количестве последняя страница по нему может
+            # оказаться пустой, поэтому возврат всегда на первую.
+            context["experiment_notes"] = current_page.page(1)
+        context["page_obj"] = context["experiment_notes"]
+        filter_query = request.GET.copy()
+        filter_query.pop("page", None)
+        context["filter_query"] = filter_query.urlencode()
+        return render(request, template_name=self.template_name, context=context)
+
+
+class ExportNotesView(LoginRequiredMixin, View):
+    """Класс представления вида View для эндпоинта выгрузки записей сотрудника в CSV."""
+
+    def get(self, request, *args, **kwargs):
+        """Метод запроса GET: потоковая выгрузка с фильтрами и поиском из параметров запроса."""
+        return csv_response(get_export_queryset(request.user, request.GET))
+
+
+class ProtectedMediaView(LoginRequiredMixin, View):
+    """Класс представления вида View для эндпоинта изображений записей и фото профиля.
+
+    Файл отдаётся только владельцу записи или фото (и администратору). Сам файл
+    Django не читает: после проверки доступа передача поручается nginx через
+    `X-Accel-Redirect` во внутренний location.
+    """
+
+    def has_access(self, name):
+        """Метод проверки доступа: фото профиля сравнивается без запроса к базе,
+        изображения записей проверяются одним запросом по индексу (владелец, изображение)."""
+        user = self.request.user
+        if user.is_superuser:
+            return True
+        source = source_name(name) or name
+        if user.avatar and user.avatar.name == source:
+            return True
+        return ExperimentNote.objects.filter(owner=user, picture=source).exists()
+
+    def get(self, request, name):
+        """Метод запроса GET: проверка доступа и передача файла nginx.
+
+        Имена с сегментами `..`, `.` и пустыми не принимаются: имя передаётся
+        nginx без нормализации.
+        """
+        if name.startswith("/") or {"", ".", ".."} & set(name.split("/")):
+            raise Http404
+        if not self.has_access(name):
+            raise Http404
+        options = settings.PROTECTED_MEDIA
+        if not options["X_ACCEL_REDIRECT"]:
+            return serve(request, name, document_root=settings.MEDIA_ROOT)
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = options["INTERNAL_LOCATION"] + name
+        # Файлы хранилища по содержимому и их копии по тому же адресу не меняются
+        if is_blob(source_name(name) or name):
+            response["Cache-Control"] = "private, max-age=31536000, immutable"
         else:
-            context["last_search_query"] = "?search_query=%s" % search_query
-            current_page = Paginator(user_entries, 10)
-
-            page = request.GET.get("page")
-            try:
-                context["experiment_notes"] = current_page.page(page)
-            except PageNotAnInteger:
-                context["experiment_notes"] = current_page.page(1)
-            except EmptyPage:
-                context["experiment_notes"] = current_page.page(current_page.num_pages)
-
-            return render(request, template_name=self.template_name, context=context)
+            response["Cache-Control"] = "private, no-cache"
+        return response
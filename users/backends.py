@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+
+from labbook.cache import get_local_cache, instance_values, invalidate_local
+
+
+def employee_cache_key(user_id):
+    return "employee:%s" % user_id
+
+
+# Столбцы, которые не попадают в кэш: хэш пароля и токен активации
+SENSITIVE_FIELDS = ("password", "token")
+
+
+def invalidate_employee(user_id):
+    """Сброс сотрудника в общем кэше и в кэше процессов.
+
+    Удаление повторяется после фиксации транзакции: иначе запрос, прочитавший
+    сотрудника до коммита, вернул бы в кэш устаревшие значения.
+    """
+    key = employee_cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+    invalidate_local(key)
+
+
+class CachedModelBackend(ModelBackend):
+    """Бэкенд аутентификации, который берёт текущего сотрудника из кэша.
+
+    `get_user` вызывается на каждом запросе с сессией. Сотрудник ищется сначала
+    в кэше процесса, затем в Redis и только потом в базе; хранится он как кортеж
+    значений столбцов и собирается заново, чтобы запросы не делили один объект.
+    Пароль и токен активации не кэшируются: вместо хэша пароля хранится
+    производный от него хэш сессии. Активность сотрудника проверяется и для
+    сотрудника из кэша. Кэш сбрасывается сигналами при любом сохранении или удалении сотрудника
+    (изменение профиля, пароля, активности).
+    """
+
+    def get_user(self, user_id):
+        user_model = get_user_model()
+        local_cache = get_local_cache()
+        key = employee_cache_key(user_id)
+        packed = local_cache.get(key)
+        if packed is None:
+            packed = cache.get(key)
+            if packed is not None:
+                local_cache.set(key, packed)
+        if packed is not None:
+            attnames, values, session_auth_hash = packed
+            user = user_model.from_db("default", attnames, values)
+            user._session_auth_hash = session_auth_hash
+            return user if self.user_can_authenticate(user) else None
+        user = super().get_user(user_id)
+        if user is not None:
+            attnames = tuple(
+                field.attname
+                for field in user_model._meta.concrete_fields
+                if field.attname not in SENSITIVE_FIELDS
+            )
+            packed = (
+                attnames,
+                instance_values(user, attnames),
+                user.get_session_auth_hash(),
+            )
+            cache.set(key, packed, settings.EMPLOYEE_CACHE_TIMEOUT)
+            local_cache.set(key, packed)
+        return user
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:44
+
+import django.core.validators
+import users.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_alter_employee_is_active"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="employee",
+            name="avatar",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                upload_to="users/photos",
+                validators=[
+                    users.validators.image_validate,
+                    django.core.validators.FileExtensionValidator(
+                        ["jpg", "jpeg", "png", "webp", "avif"],
+                        "Расширение файла « %(extension)s » не допускается. Разрешенные расширения: %(allowed_extensions)s .Недопустимое расширение!",
+                    ),
+                ],
+                verbose_name="Фото профиля сотрудника",
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:47
+
+import django.core.validators
+import labbook.storage
+import users.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_image_formats"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="employee",
+            name="avatar",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=labbook.storage.get_blob_storage,
+                upload_to="users/photos",
+                validators=[
+                    users.validators.image_validate,
+                    django.core.validators.FileExtensionValidator(
+                        ["jpg", "jpeg", "png", "webp", "avif"],
+                        "Расширение файла « %(extension)s » не допускается. Разрешенные расширения: %(allowed_extensions)s .Недопустимое расширение!",
+                    ),
+                ],
+                verbose_name="Фото профиля сотрудника",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_media_blobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employee",
+            name="avatar_width",
+            field=models.PositiveIntegerField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Ширина фото профиля",
+            ),
+        ),
+    ]
@@ -2,7 +2,8 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import FileExtensionValidator
 from django.contrib.auth.models import BaseUserManager
-from .validators import image_validate
+from .validators import IMAGE_EXTENSIONS, image_validate
+from labbook.storage import get_blob_storage
 
 
 class EmployeeManager(BaseUserManager):
@@ -40,19 +41,26 @@ class Employee(AbstractUser):
     )
     avatar = models.ImageField(
         upload_to="users/photos",
+        storage=get_blob_storage,
         null=True,
         blank=True,
         verbose_name="Фото профиля сотрудника",
         validators=[
             image_validate,
             FileExtensionValidator(
-                ["jpg", "png"],
+                IMAGE_EXTENSIONS,
                 "Расширение файла « %(extension)s » не допускается. "
                 "Разрешенные расширения: %(allowed_extensions)s ."
                 "Недопустимое расширение!",
             ),
         ],
     )
+    avatar_width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Ширина фото профиля",
+    )
     phone = models.CharField(unique=True, max_length=12, verbose_name="Номер телефона")
     username = None
 
@@ -71,6 +79,19 @@ class Employee(AbstractUser):
 
     objects = EmployeeManager()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает фото профиля на момент загрузки из базы (для счётчика ссылок на файлы)."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_avatar = instance.__dict__.get("avatar")
+        return instance
+
+    def get_session_auth_hash(self):
+        """Хэш сессии; для сотрудника из кэша, собранного без пароля, берётся сохранённый."""
+        if "password" not in self.__dict__ and hasattr(self, "_session_auth_hash"):
+            return self._session_auth_hash
+        return super().get_session_auth_hash()
+
     def __str__(self):
         """Метод для модели "Сотрудник"."""
         return f"{self.email}"
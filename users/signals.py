@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from labbook.blobs import release_file_ref, update_file_refs
+from labbook.thumbnails import record_image_width, schedule_thumbnails
+
+from .backends import invalidate_employee
+from .models import Employee
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def employee_changed(sender, instance, **kwargs):
+    """Сброс сотрудника в кэше при изменении профиля, пароля или активности."""
+    invalidate_employee(instance.pk)
+
+
+@receiver(pre_save, sender=Employee)
+def employee_avatar_changing(sender, instance, raw=False, **kwargs):
+    """Запись ширины нового фото профиля (по ней выбираются его копии)."""
+    if not raw:
+        record_image_width(instance, "avatar")
+
+
+@receiver(post_save, sender=Employee)
+def employee_avatar_saved(sender, instance, created, raw=False, **kwargs):
+    """Учёт ссылки на файл фото профиля и создание его уменьшенных копий
+    вне обработки запроса."""
+    if not raw:
+        update_file_refs(instance, "avatar", created)
+        schedule_thumbnails(instance.avatar)
+
+
+@receiver(post_delete, sender=Employee)
+def employee_avatar_deleted(sender, instance, **kwargs):
+    """Снятие ссылки на файл фото профиля удалённого сотрудника."""
+    release_file_ref(instance, "avatar")
@@ -1,9 +1,23 @@
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.core.cache import cache
 from rest_framework.test import APITestCase
 from django.test.utils import override_settings
 
+from labbook.cache import get_local_cache
+from users.backends import CachedModelBackend, employee_cache_key
+
+SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+
 # Мы используем locmem backend, чтобы письма складывались в mail.outbox
 EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
 
@@ -139,3 +153,69 @@ class TestCase(APITestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertContains(resp, "Такого email еще нет в системе")
         self.assertEqual(len(mail.outbox), 0)
+
+    def test_cached_user_invalidated_on_password_and_activity_change(self):
+        """
+        Тест на сброс закэшированного сотрудника при смене пароля и блокировке.
+        """
+        profile_url = reverse("users:profile", args=[self.active_user.pk])
+        self.client.force_login(self.active_user)
+        self.assertEqual(self.client.get(profile_url).status_code, 200)
+
+        self.active_user.set_password("AnotherPass!123")
+        self.active_user.save()
+        self.assertEqual(self.client.get(profile_url).status_code, 302)
+
+        self.client.force_login(self.active_user)
+        self.assertEqual(self.client.get(profile_url).status_code, 200)
+        self.active_user.is_active = False
+        self.active_user.save(update_fields=["is_active"])
+        self.assertEqual(self.client.get(profile_url).status_code, 302)
+
+    def test_purge_sessions_deletes_expired_in_batches(self):
+        """
+        Тест на пакетное удаление истёкших сессий.
+        """
+        store = SessionStore()
+        store.create()
+        Session.objects.bulk_create(
+            Session(
+                session_key=f"expired{i}",
+                session_data="",
+                expire_date=timezone.now() - timedelta(days=1),
+            )
+            for i in range(5)
+        )
+        out = StringIO()
+        call_command("purge_sessions", batch_size=2, stdout=out)
+        self.assertIn("5", out.getvalue())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), [store.session_key])
+
+    def test_cached_user_has_no_secrets_and_is_checked_for_activity(self):
+        """
+        Тест на кэш сотрудника без пароля и токена и на проверку активности.
+        """
+        backend = CachedModelBackend()
+        self.assertEqual(backend.get_user(self.inactive_user.pk), None)
+        user = backend.get_user(self.active_user.pk)
+        attnames, values, session_auth_hash = cache.get(employee_cache_key(user.pk))
+        self.assertNotIn("password", attnames)
+        self.assertNotIn("token", attnames)
+        self.assertNotIn(self.active_user.password, values)
+
+        cached = backend.get_user(self.active_user.pk)
+        self.assertEqual(cached.get_session_auth_hash(), self.active_user.get_session_auth_hash())
+        self.assertIn("password", cached.get_deferred_fields())
+
+        index = attnames.index("is_active")
+        values = values[:index] + (False,) + values[index + 1:]
+        cache.set(employee_cache_key(user.pk), (attnames, values, session_auth_hash))
+        get_local_cache().clear()
+        self.assertEqual(backend.get_user(self.active_user.pk), None)
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.active_user.save()
+        backend.get_user(self.active_user.pk)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(cache.get(employee_cache_key(user.pk)), None)
@@ -1,5 +1,8 @@
 from django.core.exceptions import ValidationError
 
+# Расширения загружаемых изображений (записи об экспериментах и фото сотрудников)
+IMAGE_EXTENSIONS = ["jpg", "jpeg", "png", "webp", "avif"]
+
 
 def image_validate(image):
     """Функция для проверки размера загружаемого изображения."""